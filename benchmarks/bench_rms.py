@@ -0,0 +1,58 @@
+'''
+Compare the RMS front end of FloorControlDetector with the audioop based
+one it replaced: de-interleaving with `audioop.tomono` and calling
+`audioop.rms` on each channel.
+
+    $ python -m benchmarks.bench_rms
+'''
+import warnings
+
+import numpy as np
+
+from floor_control import core
+
+from . import harness
+
+SAMPLE_RATE = 48000
+BUFFER_DURATION = 0.02
+
+
+def audioop_rms(audioop, fragment, sample_width):
+    left = audioop.tomono(fragment, sample_width, 1, 0)
+    right = audioop.tomono(fragment, sample_width, 0, 1)
+    return [audioop.rms(left, sample_width), audioop.rms(right, sample_width)]
+
+
+def numpy_rms(fragment, sample_width):
+    samples = core.to_samples(fragment, sample_width, channels=2)
+    return core.frame_rms(samples).tolist()
+
+
+def main():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        try:
+            import audioop
+        except ImportError:
+            audioop = None
+
+    rng = np.random.default_rng(0)
+    buffer_size = int(SAMPLE_RATE * BUFFER_DURATION)
+    for sample_width in [1, 2, 4]:
+        dtype = core._INT_DTYPES[sample_width]
+        info = np.iinfo(dtype)
+        fragment = rng.integers(
+            info.min, info.max, size=(buffer_size, 2), dtype=dtype
+        ).tobytes()
+        numpy_time = harness.measure(lambda: numpy_rms(fragment, sample_width))['min']
+        line = f'{8 * sample_width}-bit stereo: numpy {numpy_time * 1e6:.2f}us'
+        if audioop is not None:
+            audioop_time = harness.measure(
+                lambda: audioop_rms(audioop, fragment, sample_width)
+            )['min']
+            line += f', audioop {audioop_time * 1e6:.2f}us'
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+'''
+Load test the floor control server.
+
+Starts `python -m floor_control.server` on a Unix socket, streams
+synthetic dialogues in real time from many concurrent sessions, and
+reports the decision latency (from sending the buffer that changed the
+floor until receiving the event) and how many sessions a single core of
+the server can handle.
+
+    $ python -m benchmarks.bench_server --sessions 500 --duration 30
+'''
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+BUFFER_DURATION = 0.02
+TURN_DURATION = 2  # Seconds
+
+
+def dialogue_buffers(rng):
+    '''
+    Two prebuilt buffers (2 channels, 16-bit): the first with interactant 0
+    speaking and the second with interactant 1 speaking.
+    '''
+    buffer_size = int(SAMPLE_RATE * BUFFER_DURATION)
+    noise = rng.standard_normal((buffer_size, 2))
+    return [
+        (noise * amplitudes).astype(np.int16).tobytes()
+        for amplitudes in ([8000, 100], [100, 8000])
+    ]
+
+
+class Session:
+    def __init__(self, reader, writer, buffers, offset):
+        self.reader = reader
+        self.writer = writer
+        self.buffers = buffers
+        self.offset = offset
+        self.sent_at = []
+        self.latencies = []
+
+    def send(self, index):
+        turns = (index + self.offset) * BUFFER_DURATION // TURN_DURATION
+        data = self.buffers[int(turns % 2)]
+        self.sent_at.append(time.perf_counter())
+        self.writer.write(len(data).to_bytes(4, 'big') + data)
+
+    async def receive(self):
+        async for line in self.reader:
+            event = json.loads(line)
+            received_at = time.perf_counter()
+            self.latencies.append(received_at - self.sent_at[event['buffer']])
+
+
+async def load_test(path, n_sessions, duration):
+    rng = np.random.default_rng(1234)
+    buffers = dialogue_buffers(rng)
+    sessions = []
+    for i in range(n_sessions):
+        reader, writer = await asyncio.open_unix_connection(path)
+        offset = rng.integers(int(TURN_DURATION / BUFFER_DURATION))
+        sessions.append(Session(reader, writer, buffers, offset))
+    receiving = [asyncio.ensure_future(s.receive()) for s in sessions]
+
+    # Send one buffer from every session each buffer duration
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for index in range(int(duration / BUFFER_DURATION)):
+        await asyncio.sleep(max(0, start + index * BUFFER_DURATION - loop.time()))
+        for session in sessions:
+            session.send(index)
+
+    for session in sessions:
+        session.writer.write_eof()
+    await asyncio.gather(*receiving)
+    return np.concatenate([s.latencies for s in sessions])
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sessions', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10, help='seconds')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = str(pathlib.Path(tmp_dir) / 'floor_control.sock')
+        server = subprocess.Popen([
+            sys.executable, '-m', 'floor_control.server',
+            '--unix', path,
+            '--sample-rate', str(SAMPLE_RATE),
+            '--buffer-duration', str(BUFFER_DURATION),
+        ])
+        try:
+            while not os.path.exists(path):
+                time.sleep(0.01)
+            latencies = asyncio.run(load_test(path, args.sessions, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_time = usage.ru_utime + usage.ru_stime
+    print(json.dumps({
+        'sessions': args.sessions,
+        'duration': args.duration,
+        'events': len(latencies),
+        'latency_p50_ms': 1000 * np.percentile(latencies, 50),
+        'latency_p99_ms': 1000 * np.percentile(latencies, 99),
+        'server_cpu_seconds': cpu_time,
+        'sessions_per_core': args.sessions * args.duration / cpu_time,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+'''
+Compare the per-frame YIN pitch extraction (`yin.compute_yin` applied
+along the frames axis) with the batched `yin.compute_yin_batch`, on a
+long synthetic signal.
+
+    $ python -m benchmarks.bench_yin
+'''
+import pathlib
+import sys
+import warnings
+
+import numpy as np
+
+from . import harness
+
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1] / 'experiments'))
+from utils import yin  # noqa: E402
+
+SAMPLE_RATE = 44100
+BUFFER_DURATION = 0.05
+DURATION = 60  # Seconds
+
+
+def synthetic_signal(rng, duration):
+    '''
+    A gliding tone with some noise, and a silent tenth.
+    '''
+    t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    f0 = 150 + 100 * np.sin(2 * np.pi * 0.3 * t)
+    signal = np.sin(2 * np.pi * np.cumsum(f0) / SAMPLE_RATE)
+    signal += 0.02 * rng.standard_normal(len(t))
+    signal[:len(t) // 10] = 0
+    return signal
+
+
+def main():
+    rng = np.random.default_rng(1234)
+    buffer_size = int(SAMPLE_RATE * BUFFER_DURATION)
+    signal = synthetic_signal(rng, DURATION)
+    frames = signal[:len(signal) // buffer_size * buffer_size].reshape(-1, buffer_size)
+
+    with warnings.catch_warnings():
+        # Silent frames divide by zero in the CMND function
+        warnings.simplefilter('ignore', RuntimeWarning)
+        per_frame = np.apply_along_axis(yin.compute_yin, 1, frames, SAMPLE_RATE)
+        batch = yin.compute_yin_batch(frames, SAMPLE_RATE)
+        np.testing.assert_allclose(batch, per_frame)
+
+        per_frame_time = harness.measure(
+            lambda: np.apply_along_axis(yin.compute_yin, 1, frames, SAMPLE_RATE),
+            repeat=3,
+        )['min']
+        batch_time = harness.measure(
+            lambda: yin.compute_yin_batch(frames, SAMPLE_RATE),
+            repeat=3,
+        )['min']
+
+    print(f'{len(frames)} frames ({DURATION}s):')
+    print(f'compute_yin per frame: {per_frame_time:.3f}s')
+    print(f'compute_yin_batch: {batch_time:.3f}s ({per_frame_time / batch_time:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
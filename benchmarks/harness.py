@@ -0,0 +1,140 @@
+'''
+A minimal benchmark harness: register benchmarks with parameters, time
+them with `timeit`, and store the results as JSON to compare runs across
+commits.
+'''
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import timeit
+
+import numpy as np
+
+REPEAT = 5
+MIN_TIME = 0.2  # Seconds per repeat
+
+
+class Skip(Exception):
+    '''
+    Raised by a benchmark setup when it can't run, e.g. on a missing
+    optional dependency.
+    '''
+
+
+def measure(func, repeat=REPEAT, min_time=MIN_TIME):
+    '''
+    Time func, calling it enough times for min_time seconds per repeat.
+    Returns the min and median seconds per call, and the calls per repeat.
+    '''
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'min': min(times),
+        'median': statistics.median(times),
+        'number': number,
+    }
+
+
+class Suite:
+    def __init__(self):
+        self.benchmarks = {}
+
+    def benchmark(self, **params):
+        '''
+        Decorator registering a benchmark for every combination of the
+        params values. The decorated function is the setup: it gets the
+        parameters as keyword arguments and returns the function to time.
+        '''
+        def decorator(setup):
+            self.benchmarks[setup.__name__] = (setup, params)
+            return setup
+        return decorator
+
+    def run(self, pattern='', repeat=REPEAT, min_time=MIN_TIME, log=print):
+        results = []
+        for name, (setup, params) in self.benchmarks.items():
+            if pattern not in name:
+                continue
+            for values in itertools.product(*params.values()):
+                kwargs = dict(zip(params, values))
+                result = {'name': name, 'params': kwargs}
+                try:
+                    func = setup(**kwargs)
+                except Skip as e:
+                    result['skipped'] = str(e)
+                else:
+                    result.update(measure(func, repeat, min_time))
+                results.append(result)
+                log(format_result(result))
+        return results
+
+
+def format_result(result):
+    params = ', '.join(f'{k}={v}' for k, v in result['params'].items())
+    label = f'{result["name"]}({params})'
+    if 'skipped' in result:
+        return f'{label}: skipped ({result["skipped"]})'
+    return f'{label}: {format_time(result["min"])}'
+
+
+def format_time(seconds):
+    for unit, scale in [('s', 1), ('ms', 1e-3)]:
+        if seconds >= scale:
+            return f'{seconds / scale:.2f}{unit}'
+    return f'{seconds * 1e6:.2f}us'
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'system': platform.platform(),
+    }
+
+
+def save(filepath, results):
+    with open(filepath, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=1)
+
+
+def load(filepath):
+    with open(filepath) as f:
+        return json.load(f)
+
+
+def compare(baseline, results, threshold=1.1):
+    '''
+    Yield lines comparing the min time of every benchmark that ran in both
+    baseline and results, marking changes beyond threshold.
+    '''
+    def key(result):
+        return result['name'], json.dumps(result['params'], sort_keys=True)
+
+    baseline = {key(r): r for r in baseline['results'] if 'min' in r}
+    for result in results:
+        before = baseline.get(key(result))
+        if before is None or 'min' not in result:
+            continue
+        ratio = result['min'] / before['min']
+        mark = ''
+        if ratio > threshold:
+            mark = ' SLOWER'
+        elif ratio < 1 / threshold:
+            mark = ' faster'
+        yield f'{format_result(result)} ({ratio:.2f}x baseline){mark}'
@@ -0,0 +1,174 @@
+'''
+Benchmarks of the detector hot path and of the experiments feature
+extraction, on synthetic deterministic dialogues.
+
+    $ python -m benchmarks.suite -o results.json
+    $ python -m benchmarks.suite -o new.json --compare results.json
+
+Use --filter to run only the benchmarks whose name contains a string.
+'''
+import argparse
+import pathlib
+import sys
+import warnings
+
+import numpy as np
+
+import floor_control
+from floor_control import core
+
+from . import harness
+
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1] / 'experiments'))
+from utils import audio, yin  # noqa: E402
+
+BUFFER_DURATION = 0.02
+LSTM_BUFFER_DURATION = 0.05
+TURN_DURATION = 2  # Seconds
+SEED = 1234
+
+suite = harness.Suite()
+
+
+def dialogue(n_interactants, sample_rate, duration, buffer_duration=BUFFER_DURATION):
+    '''
+    Synthetic dialogue as (buffers, buffer_size, interactants) int16
+    samples: noise on every channel, and a louder gliding tone taking turns
+    between the interactants every TURN_DURATION seconds.
+    '''
+    rng = np.random.default_rng(SEED)
+    buffer_size = int(sample_rate * buffer_duration)
+    n_buffers = int(duration / buffer_duration)
+    t = np.arange(n_buffers * buffer_size) / sample_rate
+    f0 = 150 + 100 * np.sin(2 * np.pi * 0.3 * t)
+    tone = 8000 * np.sin(2 * np.pi * np.cumsum(f0) / sample_rate)
+    samples = 100 * rng.standard_normal((len(t), n_interactants))
+    speaker = (t // TURN_DURATION).astype(int) % n_interactants
+    samples[np.arange(len(t)), speaker] += tone
+    return samples.astype(np.int16).reshape(n_buffers, buffer_size, n_interactants)
+
+
+def cycle(items):
+    '''
+    Return a function returning the next item every call, round robin.
+    '''
+    state = {'index': -1}
+
+    def next_item():
+        state['index'] = (state['index'] + 1) % len(items)
+        return items[state['index']]
+    return next_item
+
+
+@suite.benchmark(n_interactants=[2, 8, 32], sample_rate=[16000, 44100, 48000])
+def detector_process(n_interactants, sample_rate):
+    buffers = dialogue(n_interactants, sample_rate, duration=2 * TURN_DURATION)
+    fragments = [buffer.tobytes() for buffer in buffers]
+    detector = floor_control.FloorControlDetector(
+        sample_rate=sample_rate,
+        sample_width=2,
+        num_of_interactants=n_interactants,
+        buffer_duration=BUFFER_DURATION,
+    )
+    next_fragment = cycle(fragments)
+    return lambda: detector.process(next_fragment())
+
+
+@suite.benchmark(instrument=[False, True])
+def detector_instrumentation(instrument):
+    buffers = dialogue(2, 48000, duration=2 * TURN_DURATION)
+    fragments = [buffer.tobytes() for buffer in buffers]
+    detector = floor_control.FloorControlDetector(
+        sample_rate=48000,
+        sample_width=2,
+        buffer_duration=BUFFER_DURATION,
+        instrument=instrument,
+    )
+    next_fragment = cycle(fragments)
+    return lambda: detector.process(next_fragment())
+
+
+@suite.benchmark(order=[2, 4])
+def filter_process(order):
+    filter_ = core.Filter(cutoff_freq=0.35, sample_rate=1 / BUFFER_DURATION, order=order)
+    next_sample = cycle(np.random.default_rng(SEED).random(1000).tolist())
+    return lambda: filter_.process(next_sample())
+
+
+@suite.benchmark(n_interactants=[2, 8, 32])
+def stable_argmax_process(n_interactants):
+    argmax = core.StableArgmax(hysteresis=0.1)
+    rows = np.random.default_rng(SEED).random((1000, n_interactants)).tolist()
+    next_row = cycle(rows)
+    return lambda: argmax.process(next_row())
+
+
+@suite.benchmark(sample_rate=[16000, 44100])
+def compute_yin(sample_rate):
+    buffers = dialogue(1, sample_rate, duration=1, buffer_duration=LSTM_BUFFER_DURATION)
+    frames = buffers[:, :, 0] / np.iinfo(np.int16).max
+    next_frame = cycle(list(frames))
+
+    def func():
+        with warnings.catch_warnings():
+            # Silent frames divide by zero in the CMND function
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return yin.compute_yin(next_frame(), sample_rate)
+    return func
+
+
+@suite.benchmark(duration=[60])
+def calculate_spectral_flux(duration):
+    buffers = dialogue(2, 44100, duration, buffer_duration=LSTM_BUFFER_DURATION)
+    buffers = buffers / np.iinfo(np.int16).max
+
+    def func():
+        with np.errstate(invalid='ignore'):
+            return audio.calculate_spectral_flux(buffers)
+    return func
+
+
+@suite.benchmark(shuffle=[False, True])
+def batch_generator_getitem(shuffle):
+    try:
+        from utils import lstm
+    except ImportError as e:
+        raise harness.Skip(e)
+    rng = np.random.default_rng(SEED)
+    # 5 minutes of LSTM features in 3 parts
+    Xs = [rng.standard_normal((2000, 12)) for _ in range(3)]
+    ys = [rng.random((2000, 2)) > 0.5 for _ in range(3)]
+    generator = lstm.BatchGenerator(
+        Xs, [y[:, 0] for y in ys], shuffle=shuffle, prefetch=False, seed=SEED
+    )
+    next_index = cycle(range(len(generator)))
+    return lambda: generator[next_index()]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run the benchmarks and store the results as JSON',
+    )
+    parser.add_argument('-o', '--output', type=pathlib.Path)
+    parser.add_argument('--filter', default='', help='run only matching benchmarks')
+    parser.add_argument('--compare', type=pathlib.Path, help='baseline JSON results')
+    parser.add_argument('--repeat', type=int, default=harness.REPEAT)
+    parser.add_argument(
+        '--min-time',
+        type=float,
+        default=harness.MIN_TIME,
+        help='seconds per repeat (default: %(default)s)',
+    )
+    args = parser.parse_args()
+
+    results = suite.run(args.filter, args.repeat, args.min_time)
+    if args.output:
+        harness.save(args.output, results)
+    if args.compare:
+        print(f'\nCompared to {args.compare}:')
+        for line in harness.compare(harness.load(args.compare), results):
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+'''
+Test helpers, importable from the tests as `conftest`.
+'''
+import numpy as np
+
+
+def square_wave(amplitudes, buffer_size):
+    '''
+    A (buffer_size, interactants) 16-bit buffer of square waves, with the
+    given amplitude for every interactant.
+    '''
+    signs = np.resize([1, -1], (buffer_size, 1))
+    return (signs * np.asarray(amplitudes)).astype(np.int16)
+
+
+def square_waves(amplitudes, buffer_size):
+    '''
+    One `square_wave` buffer per row of amplitudes.
+    '''
+    return [square_wave(a, buffer_size) for a in amplitudes]
+
+
+def dialogue(
+    turns,
+    turn_size,
+    interactants=2,
+    loud=8000,
+    quiet=100,
+    dtype=np.int16,
+    seed=1234,
+):
+    '''
+    (turns * turn_size, interactants) samples of Gaussian noise. Every
+    interactant is either loud or quiet, chosen at random for every turn.
+    '''
+    rng = np.random.default_rng(seed)
+    loudness = rng.integers(0, 2, (turns, interactants)) * (loud - quiet) + quiet
+    loudness = np.repeat(loudness, turn_size, axis=0)
+    return (rng.standard_normal(loudness.shape) * loudness).astype(dtype)
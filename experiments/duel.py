@@ -0,0 +1,34 @@
+import argparse
+
+import extract_fcd_features
+import extract_lstm_features
+import extract_utterances
+import predict_vad
+import utils.pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Extract all the DUEL features, skipping the ones '
+        'that are up to date',
+    )
+    parser.add_argument(
+        '--processes',
+        type=int,
+        help='number of sessions to process in parallel (default: CPU count)',
+    )
+    args = parser.parse_args()
+
+    utils.pipeline.run(
+        [
+            extract_utterances.STAGE,
+            extract_fcd_features.STAGE,
+            predict_vad.stage(),
+            extract_lstm_features.STAGE,
+        ],
+        processes=args.processes,
+    )
+
+
+if __name__ == '__main__':
+    main()
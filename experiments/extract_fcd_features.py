@@ -3,35 +3,54 @@ import pathlib
 import numpy as np
 
 import utils.audio
-import utils.duel
-import utils.path
+import utils.pipeline
+import utils.store
 
 OUT_DIR = pathlib.Path('features') / 'FCD'
 BUFFER_DURATION = 0.02
+# Bump when the extraction changes, to invalidate stored features
+VERSION = 2
 
 
-def main():
-    utils.path.empty_dir(OUT_DIR)
+def outputs(session, part):
+    return [OUT_DIR / f'{session["name"]}-{part["name"]}.npy']
+
+
+def calculate_rms(samples, sample_rate, buffer_duration):
+    buffer_size = int(sample_rate * buffer_duration)
+    buffers = utils.audio.to_chunks(samples, buffer_size)
+    return np.apply_along_axis(utils.audio.rms, axis=1, arr=buffers)
 
-    data_gen = utils.duel.load_sessions_gen()
 
-    for session in data_gen:
-        samples, sample_rate = utils.duel.load_samples(session)
+def features(session, part, audio, buffer_duration=BUFFER_DURATION, store=None):
+    '''
+    RMS features of a session part, from the feature store if available.
+    '''
+    store = store or utils.store.FeatureStore()
+    params = {'buffer_duration': buffer_duration, 'version': VERSION}
+    return store.get_or_compute(
+        session, part, 'FCD', params,
+        lambda: calculate_rms(*audio.part(part), buffer_duration),
+    )
 
-        for part in session['parts']:
-            start_pos = int(part['start_time'] * sample_rate)
-            end_pos = int(part['end_time'] * sample_rate)
-            buffer_size = int(sample_rate * BUFFER_DURATION)
 
-            part_samples = samples[start_pos:end_pos]
+def run(session, parts, audio):
+    for part in parts:
+        out_filepath, = outputs(session, part)
+        print(f'Generating {out_filepath}')
+        np.save(out_filepath, features(session, part, audio))
 
-            out_filepath = OUT_DIR / f'{session["name"]}-{part["name"]}.npy'
-            print(f'Generating {out_filepath}')
 
-            buffers = utils.audio.to_chunks(part_samples, buffer_size)
-            rms = np.apply_along_axis(utils.audio.rms, axis=1, arr=buffers)
+STAGE = utils.pipeline.Stage(
+    name='FCD features',
+    params={'buffer_duration': BUFFER_DURATION, 'version': VERSION},
+    outputs=outputs,
+    run=run,
+)
 
-            np.save(out_filepath, rms)
+
+def main():
+    utils.pipeline.run([STAGE])
 
 
 if __name__ == '__main__':
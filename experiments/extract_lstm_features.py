@@ -4,19 +4,22 @@ import numpy as np
 import scipy.stats as sstats
 
 import utils.audio
-import utils.duel
 import utils.path
+import utils.pipeline
+import utils.raster
+import utils.store
 
 OUT_DIR = pathlib.Path('features') / 'LSTM'
 BUFFER_DURATION = 0.05
+# Bump when the extraction changes, to invalidate stored features
+VERSION = 2
 
 
 def calculate_voice_activity(textgrid, start_time, end_time, buffer_duration):
-    a_utts = textgrid.get_tier_by_name('A-utts')
-    b_utts = textgrid.get_tier_by_name('B-utts')
-    return np.array([
-        [bool(utts.get_annotations_by_time(t)) for utts in [a_utts, b_utts]]
-        for t in np.arange(start_time, end_time, buffer_duration)
+    timestamps = np.arange(start_time, end_time, buffer_duration)
+    return np.column_stack([
+        utils.raster.rasterize_tier(textgrid.get_tier_by_name(name), timestamps)
+        for name in ['A-utts', 'B-utts']
     ])
 
 
@@ -28,16 +31,16 @@ def calculate_X_and_y(
         sample_rate,
         buffer_duration,
     ):
-
-    samples = samples[int(start_time * sample_rate):int(end_time * sample_rate)]
+    '''
+    samples are the samples of the part, from start_time to end_time.
+    '''
     buffer_size = int(sample_rate * buffer_duration)
     buffers = utils.audio.to_chunks(samples, buffer_size)
 
     y = calculate_voice_activity(textgrid, start_time, end_time, buffer_duration)
 
     freq = utils.audio.calculate_freq(buffers, sample_rate)
-    pitch = 69 + 12 * np.log2(freq / 440)  # MIDI note
-    pitch[pitch < 0] = 0
+    pitch = utils.audio.to_midi(freq)
     voiced = (freq != 0)
     power = np.clip(utils.audio.calculate_power(buffers), -96, 0)  # 96dB is 16bit dynamic range
     spectral_flux = np.nan_to_num(utils.audio.calculate_spectral_flux(buffers))
@@ -54,30 +57,91 @@ def calculate_X_and_y(
     return X, y
 
 
-def main():
-    utils.path.empty_dir(OUT_DIR)
-
-    data_gen = utils.duel.load_sessions_gen()
-
-    for session in data_gen:
-        samples, sample_rate = utils.duel.load_samples(session)
-
-        for part in session['parts']:
-            x_filepath = OUT_DIR / f'X-{session["name"]}-{part["name"]}.npy'
-            y_filepath = OUT_DIR / f'y-{session["name"]}-{part["name"]}.npy'
-            print(f'Generating {x_filepath} & {y_filepath}')
+def outputs(session, part):
+    return [
+        OUT_DIR / f'X-{session["name"]}-{part["name"]}.npy',
+        OUT_DIR / f'y-{session["name"]}-{part["name"]}.npy',
+    ]
+
+
+def store_params(session, buffer_duration=BUFFER_DURATION):
+    '''
+    Feature store parameters. X includes the voice activity from the
+    annotations, so stored features are invalidated when they change.
+
+    >>> import tempfile
+    >>> root = pathlib.Path(tempfile.mkdtemp())
+    >>> store = utils.store.FeatureStore(root / 'store')
+    >>> session = {
+    ...     'name': 'r1',
+    ...     'audio_filepath': root / 'r1.wav',
+    ...     'textgrid_filepath': root / 'r1.TextGrid',
+    ... }
+    >>> session['audio_filepath'].write_bytes(b'RIFF')
+    4
+    >>> session['textgrid_filepath'].write_text('A-utts')
+    6
+    >>> part = {'name': 'p1', 'start_time': 0, 'end_time': 1}
+    >>> store.get_or_compute(session, part, 'LSTM', store_params(session), lambda: np.zeros(1))
+    memmap([0.])
+    >>> session['textgrid_filepath'].write_text('A-utts B-utts')
+    13
+    >>> store.get_or_compute(session, part, 'LSTM', store_params(session), lambda: np.ones(1))
+    memmap([1.])
+    '''
+    return {
+        'buffer_duration': buffer_duration,
+        'yin': utils.audio.YIN_PARAMS,
+        'annotations': utils.path.file_signature(session['textgrid_filepath']),
+        'version': VERSION,
+    }
+
+
+def features(session, part, audio, buffer_duration=BUFFER_DURATION, store=None):
+    '''
+    X and y of a session part, from the feature store if available.
+    '''
+    store = store or utils.store.FeatureStore()
+    params = store_params(session, buffer_duration)
+    X = store.get_or_compute(
+        session, part, 'LSTM', params,
+        lambda: calculate_X_and_y(
+            part['start_time'],
+            part['end_time'],
+            session['textgrid'],
+            *audio.part(part),
+            buffer_duration,
+        )[0],
+    )
+    # The voice activity (y) is the first columns of X
+    return X, X[:, :2].astype(bool)
+
+
+def run(session, parts, audio):
+    for part in parts:
+        x_filepath, y_filepath = outputs(session, part)
+        print(f'Generating {x_filepath} & {y_filepath}')
+
+        X, y = features(session, part, audio)
+
+        np.save(x_filepath, X)
+        np.save(y_filepath, y)
+
+
+STAGE = utils.pipeline.Stage(
+    name='LSTM features',
+    params={
+        'buffer_duration': BUFFER_DURATION,
+        'yin': utils.audio.YIN_PARAMS,
+        'version': VERSION,
+    },
+    outputs=outputs,
+    run=run,
+)
 
-            X, y = calculate_X_and_y(
-                part['start_time'],
-                part['end_time'],
-                session['textgrid'],
-                samples,
-                sample_rate,
-                BUFFER_DURATION,
-            )
 
-            np.save(x_filepath, X)
-            np.save(y_filepath, y)
+def main():
+    utils.pipeline.run([STAGE])
 
 
 if __name__ == '__main__':
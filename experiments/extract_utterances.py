@@ -3,8 +3,7 @@ import pathlib
 import numpy as np
 import pandas as pd
 
-import utils.duel
-import utils.path
+import utils.pipeline
 
 ANNOTATIONS_TIERS = ['A-utts', 'B-utts']
 BACKCHANNEL_WORDS = {'ja', 'okay', 'ohm', 'mhm', 'genau'}
@@ -19,36 +18,51 @@ def is_backchannel(interval):
     return all(w in BACKCHANNEL_WORDS for w in words) and short_enough
 
 
-def main():
-    utils.path.empty_dir(OUT_DIR)
+def outputs(session, part):
+    return [OUT_DIR / f'{session["name"]}-{part["name"]}.csv']
 
-    data_gen = utils.duel.load_sessions_gen()
 
-    for session in data_gen:
-        tg = session['textgrid']
+def run(session, parts, audio):
+    tg = session['textgrid']
 
-        for part in session['parts']:
-            out_filepath = OUT_DIR / f'{session["name"]}-{part["name"]}.csv'
-            print(f'Generating {out_filepath}')
+    for part in parts:
+        out_filepath, = outputs(session, part)
+        print(f'Generating {out_filepath}')
 
-            utterances = []
-            for participant, tier_name in enumerate(ANNOTATIONS_TIERS):
-                tier = tg.get_tier_by_name(tier_name)
-                intervals = tier.get_annotations_between_timepoints(
-                    part['start_time'],
-                    part['end_time']
+        utterances = []
+        for participant, tier_name in enumerate(ANNOTATIONS_TIERS):
+            tier = tg.get_tier_by_name(tier_name)
+            intervals = tier.get_annotations_between_timepoints(
+                part['start_time'],
+                part['end_time']
+            )
+            for interval in intervals:
+                utterances.append(
+                    {
+                        'start_time': interval.start_time - part['start_time'],
+                        'end_time': interval.end_time - part['start_time'],
+                        'participant': participant,
+                        'backchannel': is_backchannel(interval),
+                    }
                 )
-                for interval in intervals:
-                    utterances.append(
-                        {
-                            'start_time': interval.start_time - part['start_time'],
-                            'end_time': interval.end_time - part['start_time'],
-                            'participant': participant,
-                            'backchannel': is_backchannel(interval),
-                        }
-                    )
-            df = pd.DataFrame(utterances)
-            df.to_csv(out_filepath, index=False)
+        df = pd.DataFrame(utterances)
+        df.to_csv(out_filepath, index=False)
+
+
+STAGE = utils.pipeline.Stage(
+    name='utterances',
+    params={
+        'tiers': ANNOTATIONS_TIERS,
+        'backchannel_words': sorted(BACKCHANNEL_WORDS),
+        'max_backchannel_duration': MAX_BACKCHANNEL_DURATION,
+    },
+    outputs=outputs,
+    run=run,
+)
+
+
+def main():
+    utils.pipeline.run([STAGE])
 
 
 if __name__ == '__main__':
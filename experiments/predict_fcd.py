@@ -1,12 +1,14 @@
 import pathlib
 
 import floor_control.core
+import floor_control.events
 import numpy as np
 
 import utils.path
 
 IN_DIR = pathlib.Path('features') / 'FCD'
 OUT_DIR = pathlib.Path('predictions') / 'FCD'
+INTERVALS_OUT_DIR = pathlib.Path('predictions') / 'FCD-intervals'
 BUFFER_DURATION = 0.02
 
 
@@ -25,14 +27,21 @@ def gen_from_rms(rms, cutoff_freq, hysteresis):
 
 
 def main():
-    utils.path.empty_dir(OUT_DIR)
+    args = utils.path.parse_prediction_args()
+    out_dir = INTERVALS_OUT_DIR if args.intervals else OUT_DIR
+    utils.path.empty_dir(out_dir)
 
     for in_filepath in IN_DIR.iterdir():
-        out_filepath = OUT_DIR / in_filepath.name
+        out_filepath = out_dir / in_filepath.name
         print(f'Generating {out_filepath}')
         rms = np.load(in_filepath)
         gen = gen_from_rms(rms, cutoff_freq=0.35, hysteresis=0.1)
-        np.save(out_filepath, np.array(list(gen)).astype(float))
+        predictions = np.array(list(gen)).astype(float)
+        if args.intervals:
+            predictions = floor_control.events.to_intervals(
+                predictions, BUFFER_DURATION
+            )
+        np.save(out_filepath, predictions)
 
 
 if __name__ == '__main__':
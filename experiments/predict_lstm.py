@@ -26,11 +26,12 @@ def main():
             out_filepath = OUT_DIR / f'{type_}-{part}.npy'
             print(f'Generating {out_filepath}')
 
-            X = np.load(IN_DIR / f'X-{part}.npy')
+            X = np.load(IN_DIR / f'X-{part}.npy', mmap_mode='r')
             if type_ == 'partial':
                 X = X[:, 2:]
-            batch_generator = utils.lstm.BatchGenerator(X, np.zeros(len(X)))
-            predictions = [m.predict(batch_generator) for m in models]
+            batch_generator = utils.lstm.BatchGenerator([X], [np.zeros(len(X))])
+            with batch_generator:
+                predictions = [m.predict(batch_generator) for m in models]
             # The model predict the next 3 seconds
             # only the first value is of interest
             predictions = np.vstack([p[:, 0] for p in predictions]).T
@@ -0,0 +1,34 @@
+import pathlib
+
+import numpy as np
+
+import utils.online_lstm
+import utils.path
+
+IN_DIR = pathlib.Path('features') / 'LSTM'
+OUT_DIR = pathlib.Path('predictions') / 'LSTM-online'
+# Same alignment as utils.lstm.shift_predictions, the prediction made
+# after a window of features is stored 2 frames after its last frame
+SHIFT = 2
+
+
+def main():
+    utils.path.empty_dir(OUT_DIR)
+
+    for type_ in ['full', 'partial']:
+        for part in utils.path.session_parts_gen(train_set=False, test_set=True):
+
+            out_filepath = OUT_DIR / f'{type_}-{part}.npy'
+            print(f'Generating {out_filepath}')
+
+            X = np.load(IN_DIR / f'X-{part}.npy', mmap_mode='r')
+            if type_ == 'partial':
+                X = X[:, 2:]
+            predictor = utils.online_lstm.OnlineLSTMPredictor(type_)
+            floor_holder = predictor.process_array(X)
+            floor_holder = np.hstack([[np.nan] * SHIFT, floor_holder])
+            np.save(out_filepath, floor_holder)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,81 +1,115 @@
-import audioop
+import fractions
+import functools
 import pathlib
-import subprocess
-import tempfile
-import wave
 
+import floor_control.events
 import numpy as np
+import scipy.signal as ssignal
 import webrtcvad
 
-import utils.audio
-import utils.duel
 import utils.path
+import utils.pipeline
 
 OUT_DIR = pathlib.Path('predictions') / 'VAD'
+INTERVALS_OUT_DIR = pathlib.Path('predictions') / 'VAD-intervals'
 BUFFER_DURATION = 0.02
-
-
-def upsample(source, target):
-    subprocess.run([
-        'ffmpeg',
-        '-y',  # Overwrite, it will always exist because a temp is created
-        '-i', source,
-        '-ar', '48000',
-        target,
-    ])
+# Because webrtcvad doesn't work with 44.1kHz
+VAD_SAMPLE_RATE = 48000
+RESAMPLE_PADDING = 0.1  # Seconds
+
+
+def resample_part(samples, sample_rate, part):
+    '''
+    Resample the (integer) samples of a part to VAD_SAMPLE_RATE, and return
+    them as a (channels, n) int16 array. Only the part, with some padding
+    on both sides to avoid edge effects, is read and resampled.
+    '''
+    ratio = fractions.Fraction(VAD_SAMPLE_RATE, sample_rate)
+    start_pos = int(VAD_SAMPLE_RATE * part['start_time'])
+    end_pos = int(VAD_SAMPLE_RATE * part['end_time'])
+    # Full buffers, the last one may end after end_time
+    n_buffers = -(-(end_pos - start_pos) // int(VAD_SAMPLE_RATE * BUFFER_DURATION))
+    end_pos = start_pos + n_buffers * int(VAD_SAMPLE_RATE * BUFFER_DURATION)
+
+    # Start on an input sample that lands exactly on an output sample, so
+    # the output is aligned with resampling the whole session
+    padding = int(RESAMPLE_PADDING * sample_rate)
+    first = max(int(start_pos / ratio) - padding, 0)
+    first -= first % ratio.denominator
+    last = min(int(end_pos / ratio) + padding, len(samples))
+    resampled = ssignal.resample_poly(
+        samples[first:last].astype(float),
+        ratio.numerator,
+        ratio.denominator,
+        axis=0,
+    )
+    offset = int(start_pos - first * ratio)
+    resampled = resampled[offset:offset + end_pos - start_pos]
+    int16 = np.iinfo(np.int16)
+    resampled = np.clip(np.round(resampled), int16.min, int16.max)
+    return np.ascontiguousarray(resampled.T, dtype=np.int16)
+
+
+def outputs(session, part, intervals=False):
+    out_dir = INTERVALS_OUT_DIR if intervals else OUT_DIR
+    return [out_dir / f'{session["name"]}-{part["name"]}.npy']
+
+
+def run(session, parts, audio, intervals=False):
+    samples, sample_rate = audio.load()
+    buffer_size = int(VAD_SAMPLE_RATE * BUFFER_DURATION)
+
+    for part in parts:
+        out_filepath, = outputs(session, part, intervals)
+        print(f'Generating {out_filepath}')
+
+        channels = resample_part(samples, sample_rate, part)
+        # (channels, buffers, buffer_size) view of complete buffers
+        n_buffers = channels.shape[1] // buffer_size
+        buffers = channels[:, :n_buffers * buffer_size].reshape(
+            len(channels), n_buffers, buffer_size
+        )
+
+        vad = webrtcvad.Vad(3)  # aggressive vad mode
+
+        results = []
+        for i in range(n_buffers):
+            vad_vals = [
+                vad.is_speech(x.tobytes(), VAD_SAMPLE_RATE)
+                for x in buffers[:, i]
+            ]
+            # Change floor holder when only one is vocalising
+            if sum(vad_vals) == 1:
+                current_floor_holder = vad_vals.index(True)
+            elif results:
+                current_floor_holder = results[-1]
+            else:
+                current_floor_holder = np.nan  # Undecided yet
+            results.append(current_floor_holder)
+
+        predictions = np.array(results).astype(float)
+        if intervals:
+            predictions = floor_control.events.to_intervals(
+                predictions, BUFFER_DURATION
+            )
+        np.save(out_filepath, predictions)
+
+
+def stage(intervals=False):
+    return utils.pipeline.Stage(
+        name='VAD intervals' if intervals else 'VAD',
+        params={
+            'buffer_duration': BUFFER_DURATION,
+            'vad_sample_rate': VAD_SAMPLE_RATE,
+        },
+        outputs=functools.partial(outputs, intervals=intervals),
+        run=functools.partial(run, intervals=intervals),
+    )
 
 
 def main():
-    utils.path.empty_dir(OUT_DIR)
-
-    data_gen = utils.duel.load_sessions_gen()
-
-    for session in data_gen:
-
-        with tempfile.NamedTemporaryFile(suffix='.wav') as tf:
-            
-            # Because webrtcvad doesn't work with 44.1
-            upsample(str(session['audio_filepath'].resolve()), tf.name)
-
-            for part in session['parts']:
-                out_filepath = OUT_DIR / f'{session["name"]}-{part["name"]}.npy'
-                print(f'Generating {out_filepath}')
-
-                with wave.open(tf.name) as f:
-                    sample_rate = f.getframerate()
-                    sample_width = f.getsampwidth()
-                    buffer_size = int(sample_rate * BUFFER_DURATION)
-                    channels = f.getnchannels()
-
-                    vad = webrtcvad.Vad(3)  # aggressive vad mode
-
-                    pos = 0  # Counting samples, not bytes
-                    start_pos = int(sample_rate * part['start_time'])
-                    end_pos = int(sample_rate * part['end_time'])
-
-                    # Seek to start_time
-                    f.readframes(start_pos)
-                    pos += start_pos
-
-                    results = []
-                    while pos < end_pos:
-                        buffer = f.readframes(buffer_size)
-                        if len(buffer) != buffer_size * sample_width * channels:
-                            break
-                        l = audioop.tomono(buffer, sample_width, 1, 0)
-                        r = audioop.tomono(buffer, sample_width, 0, 1)
-                        if session['swapped_stereo']:
-                            l, r = r, l
-                        vad_vals = [vad.is_speech(x, sample_rate) for x in [l, r]]
-                        # Change floor holder when only one is vocalising
-                        if sum(vad_vals) == 1:
-                            current_floor_holder = vad_vals.index(True)
-                        else:
-                            current_floor_holder = results[-1]
-                        results.append(current_floor_holder)
-                        pos += buffer_size
-
-                np.save(out_filepath, np.array(results).astype(float))
+    args = utils.path.parse_prediction_args()
+    utils.pipeline.run([stage(args.intervals)])
 
 
 if __name__ == '__main__':
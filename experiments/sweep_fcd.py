@@ -0,0 +1,139 @@
+import argparse
+import concurrent.futures
+import functools
+import pathlib
+
+import floor_control.core
+import numpy as np
+import pandas as pd
+import scipy.signal as ssignal
+
+import utils.annotated_floor
+import utils.path
+
+FEATURES_DIR = pathlib.Path('features')
+BUFFER_DURATION = 0.02
+# Same as in the analysis notebook: the floor is sampled at 10Hz and the
+# accuracy is measured every 10 seconds
+ANALYSIS_SAMPLE_RATE = 10
+ACCURACY_JUMP = 10 * ANALYSIS_SAMPLE_RATE
+
+
+def predict(rms, cutoff_freq, hysteresis_values):
+    '''
+    FCD predictions for every hysteresis value, as a (hysteresis values,
+    frames) array with NaN before the first decision. Same as
+    `predict_fcd.gen_from_rms` for each value, but all the channels are
+    filtered in one `lfilter` call and all the hysteresis values are
+    applied together.
+    '''
+    b, a = ssignal.butter(N=2, Wn=cutoff_freq, fs=1 / BUFFER_DURATION)
+    smooth = ssignal.lfilter(b, a, rms, axis=0)
+    hysteresis_values = np.asarray(hysteresis_values, dtype=float)[:, None]
+    argmax, decided = floor_control.core.decide(smooth, hysteresis_values)
+    # Forward fill the argmax from the last decided frame
+    last_decided = np.where(decided, np.arange(len(rms)), -1)
+    np.maximum.accumulate(last_decided, axis=1, out=last_decided)
+    return np.where(last_decided >= 0, argmax[last_decided], np.nan)
+
+
+def accuracy(predictions, floor):
+    '''
+    Like `accuracy` in the analysis notebook: the ratio of agreement with
+    the annotated floor, every ACCURACY_JUMP floor frames where both are
+    defined. Works on the last axis of predictions.
+    '''
+    step = int(1 / BUFFER_DURATION) // ANALYSIS_SAMPLE_RATE
+    predictions = predictions[..., ::step]
+    length = min(predictions.shape[-1], len(floor))
+    predictions = predictions[..., :length:ACCURACY_JUMP]
+    floor = floor[:length:ACCURACY_JUMP]
+    defined = (floor != utils.annotated_floor.UNDEFINED) & ~np.isnan(predictions)
+    with np.errstate(invalid='ignore'):
+        return (defined & (predictions == floor)).sum(axis=-1) / defined.sum(axis=-1)
+
+
+def part_accuracy(part, cutoff_freqs, hysteresis_values):
+    rms = np.load(FEATURES_DIR / 'FCD' / f'{part}.npy', mmap_mode='r')
+    utterances_df = pd.read_csv(FEATURES_DIR / 'utterances' / f'{part}.csv')
+    floor = utils.annotated_floor.values(
+        utterances_df, sample_rate=ANALYSIS_SAMPLE_RATE
+    )
+    return np.array([
+        accuracy(predict(rms, cutoff_freq, hysteresis_values), floor)
+        for cutoff_freq in cutoff_freqs
+    ])
+
+
+def sweep(parts, cutoff_freqs, hysteresis_values, processes=None):
+    '''
+    Accuracy surface, as a (cutoffs, hysteresis values) array with the mean
+    accuracy over the parts, which are processed in parallel.
+    '''
+    func = functools.partial(
+        part_accuracy,
+        cutoff_freqs=cutoff_freqs,
+        hysteresis_values=hysteresis_values,
+    )
+    with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+        accuracies = list(executor.map(func, parts))
+    return np.nanmean(accuracies, axis=0)
+
+
+def parse_range(value):
+    start, stop, num = value.split(':')
+    return np.linspace(float(start), float(stop), int(num))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Grid search of the FCD parameters for accuracy',
+    )
+    parser.add_argument(
+        '--cutoff-freqs',
+        type=parse_range,
+        default='0.05:2:40',
+        help='start:stop:num of cutoff frequencies (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--hysteresis',
+        type=parse_range,
+        default='0:2:41',
+        help='start:stop:num of hysteresis values (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--test-set',
+        action='store_true',
+        help='evaluate on the test set instead of the train set',
+    )
+    parser.add_argument('--processes', type=int)
+    parser.add_argument(
+        '-o', '--output',
+        type=pathlib.Path,
+        help='.npz file for the cutoff_freqs, hysteresis and accuracy arrays',
+    )
+    args = parser.parse_args()
+
+    parts = list(utils.path.session_parts_gen(
+        train_set=not args.test_set,
+        test_set=args.test_set,
+    ))
+    surface = sweep(parts, args.cutoff_freqs, args.hysteresis, args.processes)
+
+    i, j = np.unravel_index(np.nanargmax(surface), surface.shape)
+    print(
+        f'Best accuracy {surface[i, j]:.3f} with '
+        f'cutoff_freq={args.cutoff_freqs[i]:.3f}, '
+        f'hysteresis={args.hysteresis[j]:.3f}'
+    )
+    if args.output:
+        np.savez(
+            args.output,
+            cutoff_freqs=args.cutoff_freqs,
+            hysteresis=args.hysteresis,
+            accuracy=surface,
+        )
+
+
+if __name__ == '__main__':
+    main()
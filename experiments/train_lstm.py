@@ -16,14 +16,9 @@ def main():
 
     Xs, ys = [], []
 
-    filenames = zip(sorted(IN_DIR.glob('X*')), sorted(IN_DIR.glob('y*')))
-
     for part in utils.path.session_parts_gen(train_set=True, test_set=False):
-        Xs.append(np.load(IN_DIR / f'X-{part}.npy'))
-        ys.append(np.load(IN_DIR / f'y-{part}.npy'))
-
-    X = np.vstack(Xs)
-    y = np.vstack(ys)
+        Xs.append(np.load(IN_DIR / f'X-{part}.npy', mmap_mode='r'))
+        ys.append(np.load(IN_DIR / f'y-{part}.npy', mmap_mode='r'))
 
     for interactant, full in itertools.product([0, 1], [False, True]):
         suffix = 'full' if full else 'partial'
@@ -31,10 +26,14 @@ def main():
         print(f'Generating {out_filepath}')
         model = utils.lstm.prepare_model(full=full)
         batch_generator = utils.lstm.BatchGenerator(
-            X if full else X[:, 2:],  # Droping the 1st feature: voice activity
-            y[:, interactant]
+            # Droping the 1st feature: voice activity
+            [X if full else X[:, 2:] for X in Xs],
+            [y[:, interactant] for y in ys],
+            shuffle=True,
         )
-        model.fit(batch_generator, epochs=EPOCHS)
+        with batch_generator:
+            # The generator shuffles the windows itself
+            model.fit(batch_generator, epochs=EPOCHS, shuffle=False)
         model.save(out_filepath)
 
 
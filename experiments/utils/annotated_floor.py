@@ -1,52 +1,107 @@
-import itertools
+import numpy as np
 
-import utils.iteration
+from . import raster
 
+UNDEFINED = -1
 
-def utterances_to_floor_intervals_gen(utterances_df):
+
+def utterances_to_floor_intervals(start_times, end_times, participants):
     '''
-    A state machine that yields floor intervals based on
-    utterances intervals.
-    '''
-    intervals = utterances_df.sort_values('start_time').iterrows()
-    _, cur = next(intervals)
-    cur = cur.to_dict()
-    while True:
-        try:
-            _, nex = next(intervals)
-        except StopIteration:
-            yield cur
-            break
-        nex = nex.to_dict()
+    A state machine that returns floor intervals based on
+    utterances intervals, as arrays of start times, end times,
+    and participants.
+
+    >>> utterances_to_floor_intervals(
+    ...     start_times=[0, 1, 3, 5, 6],
+    ...     end_times=[2, 4, 4.5, 6.5, 7],
+    ...     participants=[0, 1, 1, 0, 1],
+    ... )
+    (array([0. , 2. , 5. , 6.5]), array([1. , 4.5, 6. , 7. ]), array([0, 1, 0, 1]))
+    '''
+    order = np.argsort(start_times)
+    start_times = np.asarray(start_times, dtype=float)[order].tolist()
+    end_times = np.asarray(end_times, dtype=float)[order].tolist()
+    participants = np.asarray(participants)[order].tolist()
+
+    floor_starts, floor_ends, floor_participants = [], [], []
+    cur_start, cur_end, cur_participant = start_times[0], end_times[0], participants[0]
+    for nex_start, nex_end, nex_participant in zip(
+        start_times[1:], end_times[1:], participants[1:]
+    ):
         # Current and next one are same speaker -> merge
-        if cur['participant'] == nex['participant']:
-            cur = {
-                'start_time': cur['start_time'],
-                'end_time': nex['end_time'],
-                'participant': cur['participant'],
-            }
+        if cur_participant == nex_participant:
+            cur_end = nex_end
         # Current ends before next one starts -> output current
-        elif cur['end_time'] <= nex['start_time']:
-            yield cur
-            cur = nex
+        elif cur_end <= nex_start:
+            floor_starts.append(cur_start)
+            floor_ends.append(cur_end)
+            floor_participants.append(cur_participant)
+            cur_start, cur_end, cur_participant = nex_start, nex_end, nex_participant
         # Next is completely within current -> ignore it
-        elif (
-            nex['start_time'] >= cur['start_time']
-            and nex['end_time'] <= cur['end_time']
-        ):
+        elif nex_start >= cur_start and nex_end <= cur_end:
             pass
         # Otherwise it's a partial overlap
         else:
-            yield {
-                'start_time': cur['start_time'],
-                'end_time': nex['start_time'],
-                'participant': cur['participant'],
-            }
-            cur = {
-                'start_time': cur['end_time'],
-                'end_time': nex['end_time'],
-                'participant': nex['participant']
-            }
+            floor_starts.append(cur_start)
+            floor_ends.append(nex_start)
+            floor_participants.append(cur_participant)
+            cur_start, cur_end, cur_participant = cur_end, nex_end, nex_participant
+    floor_starts.append(cur_start)
+    floor_ends.append(cur_end)
+    floor_participants.append(cur_participant)
+
+    return (
+        np.array(floor_starts),
+        np.array(floor_ends),
+        np.array(floor_participants),
+    )
+
+
+def _df_to_floor_intervals(utterances_df):
+    return utterances_to_floor_intervals(
+        utterances_df['start_time'].to_numpy(),
+        utterances_df['end_time'].to_numpy(),
+        utterances_df['participant'].to_numpy(),
+    )
+
+
+def utterances_to_floor_intervals_gen(utterances_df):
+    '''
+    Yields floor intervals based on utterances intervals.
+    '''
+    for start_time, end_time, participant in zip(*_df_to_floor_intervals(utterances_df)):
+        yield {
+            'start_time': start_time,
+            'end_time': end_time,
+            'participant': participant,
+        }
+
+
+def values(utterances_df, sample_rate):
+    '''
+    The annotated floor values (per timestamp) as described
+    in figure 2 in the paper, as an int8 array with UNDEFINED
+    (-1) instead of NaN.
+
+    >>> import pandas as pd
+    >>> utterances_df = pd.DataFrame({
+    ...     'start_time': [0, 0.2, 1],
+    ...     'end_time': [0.5, 0.4, 1.2],
+    ...     'participant': [0, 1, 1],
+    ... })
+    >>> values(utterances_df, sample_rate=4)
+    array([ 0,  0,  0, -1,  1], dtype=int8)
+    '''
+    start_times, end_times, participants = _df_to_floor_intervals(utterances_df)
+    timestamps = raster.frame_timestamps(end_times[-1], sample_rate)
+    # Overlaps can leave intervals that end before they start, drop them
+    valid = start_times <= end_times
+    start_times, end_times, participants = (
+        start_times[valid], end_times[valid], participants[valid]
+    )
+    indices = raster.rasterize(start_times, end_times, timestamps)
+    floor = np.where(indices >= 0, participants[indices], UNDEFINED)
+    return floor.astype(np.int8)
 
 
 def gen(utterances_df, sample_rate):
@@ -54,8 +109,5 @@ def gen(utterances_df, sample_rate):
     Generate the annotated floor values (per timestamp)
     as described in figure 2 in the paper.
     '''
-    yield from utils.iteration.intervals_to_values_gen(
-        utterances_to_floor_intervals_gen(utterances_df),
-        sample_rate=sample_rate,
-        key='participant',
-    )
\ No newline at end of file
+    for value in values(utterances_df, sample_rate).tolist():
+        yield float('nan') if value == UNDEFINED else value
@@ -19,7 +19,8 @@ def load_sessions_gen(annotations_dir=ANNOTATIONS_DIR, audio_dir=AUDIO_DIR):
     for session_num in sorted(session_nums):
         session_dir = annotations_dir / f'r{session_num}'
         session = session_dir.name
-        textgrid = tgt.io.read_textgrid(next(session_dir.glob('r*.TextGrid')))
+        textgrid_filepath = next(session_dir.glob('r*.TextGrid'))
+        textgrid = tgt.io.read_textgrid(textgrid_filepath)
 
         parts = []
         for part in textgrid.get_tier_by_name('Part').intervals:
@@ -31,6 +32,7 @@ def load_sessions_gen(annotations_dir=ANNOTATIONS_DIR, audio_dir=AUDIO_DIR):
         yield {
             'name': session,
             'textgrid': textgrid,
+            'textgrid_filepath': textgrid_filepath,
             'audio_filepath': audio_dir / session / (session + '.wav'),
             'parts': parts,
             'swapped_stereo': session in SWAPPED_STEREO,
@@ -38,8 +40,22 @@ def load_sessions_gen(annotations_dir=ANNOTATIONS_DIR, audio_dir=AUDIO_DIR):
 
 
 def load_samples(session):
-    sr, samples = swavfile.read(session['audio_filepath'])
-    samples = (samples / np.iinfo(samples.dtype).max)
+    '''
+    Memory map the integer samples of a session, and return them with the
+    sample rate. Use `part_samples` to read the (float) samples of a part.
+    '''
+    sr, samples = swavfile.read(session['audio_filepath'], mmap=True)
     if session['swapped_stereo']:
-        samples = samples[:, [1, 0]]
+        samples = samples[:, ::-1]  # A view, nothing is read
     return samples, sr
+
+
+def part_samples(samples, sample_rate, part, dtype=np.float32):
+    '''
+    Read the samples of a part, scaled to [-1, 1].
+    '''
+    start_pos = int(part['start_time'] * sample_rate)
+    end_pos = int(part['end_time'] * sample_rate)
+    result = samples[start_pos:end_pos].astype(dtype)
+    result /= np.iinfo(samples.dtype).max
+    return result
@@ -1,5 +1,7 @@
 import itertools
 
+from . import raster
+
 
 def dedup(iterable, key=lambda x: x):
     '''
@@ -57,15 +59,14 @@ def intervals_to_values_gen(intervals, sample_rate, key):
     >>> list(gen)
     ['X', 'X', 'X', nan, 'Y']
     '''
-    intervals = iter(intervals)
-    interval = next(intervals)
-    for i in itertools.count(step=1 / sample_rate):
-        if i > interval['end_time']:
-            try:
-                interval = next(intervals)
-            except StopIteration:
-                break
-        if i < interval['start_time']:
+    intervals = list(intervals)
+    if not intervals:
+        return
+    starts = [i['start_time'] for i in intervals]
+    ends = [i['end_time'] for i in intervals]
+    timestamps = raster.frame_timestamps(ends[-1], sample_rate)
+    for index in raster.rasterize(starts, ends, timestamps).tolist():
+        if index < 0:
             yield float('nan')
         else:
-            yield interval[key]
+            yield intervals[index][key]
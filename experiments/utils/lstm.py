@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from keras import regularizers
 from keras.layers import Dense, LSTM
 from keras.models import Sequential
@@ -54,22 +56,99 @@ def shift_predictions(x):
     return np.hstack([[np.NaN] * (SEQUENCE_LENGTH + 1), x])
 
 
+def windows(array, length):
+    '''
+    Read only view of all the windows of length rows in array, with shape
+    (len(array) - length + 1, length, *array.shape[1:]). No data is copied.
+    '''
+    # Like np.lib.stride_tricks.sliding_window_view, which is not available
+    # in the numpy version tensorflow depends on
+    return np.lib.stride_tricks.as_strided(
+        array,
+        shape=(len(array) - length + 1, length) + array.shape[1:],
+        strides=array.strides[:1] + array.strides,
+        writeable=False,
+    )
+
+
 class BatchGenerator(Sequence):
-    def __init__(self, X, y):
-        self.X = X
-        self.y = y
+    '''
+    Batches of (SEQUENCE_LENGTH frames of X, the next PREDICTION_LENGTH
+    frames of y) windows from parts of a corpus. Windows don't cross part
+    boundaries. They are views of the part arrays, which can be memory
+    mapped, so the corpus is never loaded as a whole.
 
-    def __getitem__(self, idx):
-        inputs = np.zeros((BATCH_SIZE, SEQUENCE_LENGTH, self.X.shape[-1]))
-        targets = np.zeros((BATCH_SIZE, PREDICTION_LENGTH))
-        for idx_in_batch in range(BATCH_SIZE):
-            start = idx * BATCH_SIZE + idx_in_batch
-            end = start + SEQUENCE_LENGTH
-            prediction_end = end + PREDICTION_LENGTH
-            inputs[idx_in_batch] = self.X[start:end]
-            targets[idx_in_batch] = self.y[end:prediction_end]
+    With shuffle, the windows are shuffled every epoch. With prefetch, the
+    next batch is gathered in a background thread while the current one
+    is used. The thread is stopped at the end of every epoch (and started
+    again by the next one), and by `close`. The generator is also a
+    context manager that closes it.
+    '''
+    def __init__(self, Xs, ys, shuffle=False, prefetch=True, seed=None):
+        self._inputs = [windows(X, SEQUENCE_LENGTH) for X in Xs]
+        self._targets = [windows(y, PREDICTION_LENGTH)[SEQUENCE_LENGTH:] for y in ys]
+        # (part, start) of every window
+        counts = [max(len(X) - SEQUENCE_LENGTH - PREDICTION_LENGTH, 0) for X in Xs]
+        self._parts = np.repeat(np.arange(len(counts)), counts)
+        self._starts = np.concatenate([np.arange(c) for c in counts])
+        self._order = np.arange(len(self._starts))
+        self._shuffle = shuffle
+        self._rng = np.random.default_rng(seed)
+        self._prefetch = prefetch
+        self._executor = None
+        self._prefetched = {}
+        if shuffle:
+            self._rng.shuffle(self._order)
 
+    def _batch(self, idx):
+        order = self._order[idx * BATCH_SIZE:(idx + 1) * BATCH_SIZE]
+        parts = self._parts[order]
+        starts = self._starts[order]
+        if not self._shuffle and parts[0] == parts[-1]:
+            # Consecutive windows of one part, no need to gather
+            window_slice = slice(starts[0], starts[-1] + 1)
+            return (
+                self._inputs[parts[0]][window_slice],
+                self._targets[parts[0]][window_slice].astype(float),
+            )
+        inputs = np.empty((len(order),) + self._inputs[0].shape[1:])
+        targets = np.empty((len(order), PREDICTION_LENGTH))
+        for part in np.unique(parts):
+            in_part = parts == part
+            inputs[in_part] = self._inputs[part][starts[in_part]]
+            targets[in_part] = self._targets[part][starts[in_part]]
         return inputs, targets
 
+    def __getitem__(self, idx):
+        future = self._prefetched.pop(idx, None)
+        batch = future.result() if future else self._batch(idx)
+        if self._prefetch and idx + 1 < len(self):
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+            self._prefetched[idx + 1] = self._executor.submit(self._batch, idx + 1)
+        return batch
+
     def __len__(self):
-        return int((len(self.X) - SEQUENCE_LENGTH - PREDICTION_LENGTH) / BATCH_SIZE)
\ No newline at end of file
+        return len(self._order) // BATCH_SIZE
+
+    def close(self):
+        '''
+        Stop the prefetching thread.
+        '''
+        for future in self._prefetched.values():
+            future.cancel()
+        self._prefetched.clear()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def on_epoch_end(self):
+        self.close()
+        if self._shuffle:
+            self._rng.shuffle(self._order)
@@ -0,0 +1,164 @@
+'''
+The LSTM features of `extract_lstm_features.calculate_X_and_y`, extracted
+one buffer at a time with constant memory, for live use and for
+recordings of any length.
+'''
+import numpy as np
+import scipy.signal as ssignal
+
+from . import audio
+
+
+class RunningZScore:
+    '''
+    z-score of every value with the mean and (population) standard
+    deviation of all the values so far, updated with Welford's algorithm.
+    The last value is the same as scipy.stats.zscore of all the values.
+
+    >>> import scipy.stats
+    >>> values = [3, 1, 4, 1, 5]
+    >>> running = RunningZScore(1)
+    >>> zscores = [running.process(np.array([v])) for v in values]
+    >>> np.isclose(zscores[-1], scipy.stats.zscore(values)[-1])
+    array([ True])
+    '''
+    def __init__(self, size):
+        self._count = 0
+        self._mean = np.zeros(size)
+        self._m2 = np.zeros(size)
+
+    def process(self, values):
+        self._count += 1
+        delta = values - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (values - self._mean)
+        std = np.sqrt(self._m2 / self._count)
+        # 0 instead of NaN until there is some variance
+        return np.divide(
+            values - self._mean, std, out=np.zeros_like(std), where=std > 0
+        )
+
+
+class OnlineFeatures:
+    '''
+    Extract a row of features per buffer (of buffer_duration seconds and
+    all the channels): z-scored pitch, pitch, voiced, z-scored power, and
+    z-scored spectral flux, per channel. These are the columns of X without
+    the voice activity (as used by the partial LSTM model).
+
+    The spectral flux of a buffer compares STFT frames that are shifted by
+    half a buffer, like `utils.audio.calculate_spectral_flux`, so it needs
+    the beginning of the next buffer. Thus, `process` returns the row of
+    the previous buffer (None for the first), and `flush` returns the row
+    of the last one.
+
+    The raw features are the same as the offline ones. The z-scores use
+    the statistics of the buffers so far instead of the whole recording,
+    and converge to the offline ones as the statistics settle.
+
+    For example, with a second of a tone and noise per channel:
+
+    >>> import tgt
+    >>> import extract_lstm_features
+    >>> t = np.arange(16500) / 16000
+    >>> rng = np.random.default_rng(0)
+    >>> samples = np.column_stack([
+    ...     np.sin(2 * np.pi * 200 * t) * (t < 0.5),
+    ...     np.sin(2 * np.pi * 120 * t) * (t > 0.3) + rng.standard_normal(len(t)) * 0.1,
+    ... ]) + rng.standard_normal((len(t), 2)) * 0.001
+    >>> textgrid = tgt.TextGrid()
+    >>> for name in ['A-utts', 'B-utts']:
+    ...     textgrid.add_tier(tgt.IntervalTier(0, 1.1, name))
+    >>> X, _ = extract_lstm_features.calculate_X_and_y(
+    ...     0, len(t) / 16000, textgrid, samples, 16000, 0.05
+    ... )
+    >>> buffers = audio.to_chunks(samples, 800)
+    >>> online = OnlineFeatures(16000, 0.05)
+    >>> rows = [online.process(buffer) for buffer in buffers][1:] + [online.flush()]
+    >>> rows = np.array(rows)
+
+    Pitch and voiced, the same as offline:
+
+    >>> np.array_equal(rows[:, 2:6], X[:, 4:8])
+    True
+
+    Power and spectral flux, the same as offline with running z-scores:
+
+    >>> power = np.clip(audio.calculate_power(buffers), -96, 0)
+    >>> flux = np.nan_to_num(audio.calculate_spectral_flux(buffers))
+    >>> running = RunningZScore(4)
+    >>> expected = [running.process(values) for values in np.hstack([power, flux])]
+    >>> np.allclose(rows[:, 6:], expected)
+    True
+
+    With the statistics of all the buffers, the last row is the same as
+    offline:
+
+    >>> np.allclose(rows[-1], X[-1, 2:])
+    True
+    '''
+    def __init__(self, sample_rate, buffer_duration, channels=2):
+        self._sample_rate = sample_rate
+        self._buffer_size = int(sample_rate * buffer_duration)
+        # Same STFT frames as scipy.signal.stft with the default boundary
+        # padding: frames start half a buffer before each buffer
+        self._half = self._buffer_size // 2
+        self._window = ssignal.get_window('hamming', self._buffer_size)[:, None]
+        self._scale = 1 / self._window.sum()
+        self._tail = np.zeros((self._half, channels))
+        self._spectrum = None
+        self._pending = None
+        self._zscores = [RunningZScore(channels) for _ in range(3)]
+
+    def _frame_spectrum(self, head):
+        frame = np.concatenate([self._tail, head])
+        return np.abs(np.fft.rfft(frame * self._window, axis=0)) * self._scale
+
+    def _row(self, spectrum):
+        '''
+        Complete the row of the pending buffer with the spectrum of the
+        STFT frame following it.
+        '''
+        pitch, voiced, power = self._pending
+        diff = self._spectrum - spectrum
+        rectified = (diff + np.abs(diff)) / 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            flux = np.sum(rectified, axis=0) / np.sum(self._spectrum, axis=0)
+        flux = np.nan_to_num(flux)
+        pitch_zscore, power_zscore, flux_zscore = self._zscores
+        return np.hstack([
+            pitch_zscore.process(pitch),
+            pitch,
+            voiced,
+            power_zscore.process(power),
+            flux_zscore.process(flux),
+        ])
+
+    def process(self, buffer):
+        '''
+        Process a (buffer_size, channels) buffer. Returns the features row
+        of the previous buffer, or None for the first buffer.
+        '''
+        buffer = np.asarray(buffer, dtype=float)
+        spectrum = self._frame_spectrum(buffer[:self._buffer_size - self._half])
+        row = None if self._pending is None else self._row(spectrum)
+        self._spectrum = spectrum
+
+        freq = audio.calculate_freq(buffer[None], self._sample_rate)[0]
+        with np.errstate(divide='ignore'):
+            power = np.clip(audio.calculate_power(buffer[None])[0], -96, 0)
+        self._pending = (audio.to_midi(freq), freq != 0, power)
+        self._tail = buffer[self._buffer_size - self._half:]
+        return row
+
+    def flush(self):
+        '''
+        Return the features row of the last buffer, or None if there isn't
+        any, padding the signal with zeros like the offline STFT.
+        '''
+        if self._pending is None:
+            return None
+        zeros = np.zeros((self._buffer_size - self._half, self._tail.shape[1]))
+        row = self._row(self._frame_spectrum(zeros))
+        self._pending = None
+        return row
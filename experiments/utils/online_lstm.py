@@ -0,0 +1,115 @@
+'''
+The LSTM models from `utils.lstm` in plain numpy, processing one frame
+at a time. Unlike `utils.lstm` it doesn't depend on keras / tensorflow,
+only on h5py to read the saved models.
+'''
+import json
+import pathlib
+
+import h5py
+import numpy as np
+
+MODELS_DIR = pathlib.Path('models') / 'LSTM'
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 1 / (1 + np.exp(-x)),
+    'hard_sigmoid': lambda x: np.clip(0.2 * x + 0.5, 0, 1),
+}
+
+
+def load_layers(filepath):
+    '''
+    Return (config, weights) of every layer with weights in a keras model
+    saved as .h5, in order.
+    '''
+    with h5py.File(filepath, 'r') as f:
+        model_config = json.loads(f.attrs['model_config'])
+        layers = []
+        for layer in model_config['config']['layers']:
+            config = layer['config']
+            if config['name'] not in f['model_weights']:
+                continue  # No weights, e.g. InputLayer
+            group = f['model_weights'][config['name']]
+            weights = [
+                group[name.decode()][()] for name in group.attrs['weight_names']
+            ]
+            if weights:
+                layers.append((config, weights))
+        return layers
+
+
+class OnlineLSTM:
+    '''
+    Run a stack of LSTM -> Dense models (e.g. one per interactant) frame by
+    frame, keeping the hidden and cell state of each between calls. The
+    cost of a frame is constant.
+
+    The models in `utils.lstm` see 10 seconds of features starting from a
+    zero state. Here the state is carried over from the beginning, so the
+    predictions are similar but not identical.
+    '''
+    def __init__(self, filepaths):
+        models = [load_layers(filepath) for filepath in filepaths]
+        (lstm_config, _), (dense_config, _) = models[0]
+        self._activation = ACTIVATIONS[lstm_config['activation']]
+        self._recurrent_activation = ACTIVATIONS[lstm_config['recurrent_activation']]
+        self._dense_activation = ACTIVATIONS[dense_config['activation']]
+        # Stack the weights of the models on the first axis
+        (
+            self._kernel,
+            self._recurrent_kernel,
+            self._bias,
+            self._dense_kernel,
+            self._dense_bias,
+        ) = [
+            np.stack(weights).astype(float)
+            for weights in zip(*[lstm + dense for (_, lstm), (_, dense) in models])
+        ]
+        self.reset()
+
+    def reset(self):
+        n_models, units, _ = self._recurrent_kernel.shape
+        self._h = np.zeros((n_models, units))
+        self._c = np.zeros((n_models, units))
+
+    def process(self, features):
+        '''
+        Process the features of one frame. Returns the dense layer output of
+        every model, as a (models, outputs) array.
+        '''
+        z = (
+            np.asarray(features, dtype=float) @ self._kernel
+            + np.einsum('mu,muv->mv', self._h, self._recurrent_kernel)
+            + self._bias
+        )
+        # Keras gates order: input, forget, cell, output
+        i, f, c, o = np.split(z, 4, axis=1)
+        i = self._recurrent_activation(i)
+        f = self._recurrent_activation(f)
+        o = self._recurrent_activation(o)
+        self._c = f * self._c + i * self._activation(c)
+        self._h = o * self._activation(self._c)
+        return self._dense_activation(
+            np.einsum('mu,muv->mv', self._h, self._dense_kernel) + self._dense_bias
+        )
+
+
+class OnlineLSTMPredictor:
+    '''
+    Floor holder prediction with the per interactant models of a type
+    ('full' or 'partial'), for one frame of features at a time.
+    '''
+    def __init__(self, type_='full', models_dir=MODELS_DIR):
+        self._lstm = OnlineLSTM([
+            pathlib.Path(models_dir) / f'model_{i}_{type_}.h5' for i in range(2)
+        ])
+
+    def process(self, features):
+        # Each model predicts the next 3 seconds of its interactant's voice
+        # activity, only the next frame is of interest
+        return int(self._lstm.process(features)[:, 0].argmax())
+
+    def process_array(self, X):
+        return np.array([self.process(features) for features in X])
@@ -1,3 +1,4 @@
+import argparse
 import pathlib
 import shutil
 
@@ -13,6 +14,15 @@ def empty_dir(dir_ : pathlib.Path):
     dir_.mkdir(parents=True)
 
 
+def file_signature(filepath):
+    '''
+    Modification time and size of a file, to detect changes without
+    reading it.
+    '''
+    stat = pathlib.Path(filepath).stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+
 def session_parts_gen(*, train_set, test_set):
     '''
     Yield part names according to train_set and
@@ -24,3 +34,17 @@ def session_parts_gen(*, train_set, test_set):
             yield part_name
         elif test_set and (i % 4 == 0):
             yield part_name
+
+
+def parse_prediction_args():
+    '''
+    Parse the command line arguments shared by the prediction scripts.
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--intervals',
+        action='store_true',
+        help='store (start_time, end_time, floor_holder) intervals '
+        'instead of a floor holder per frame',
+    )
+    return parser.parse_args()
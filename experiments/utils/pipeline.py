@@ -0,0 +1,121 @@
+import collections
+import concurrent.futures
+import json
+import pathlib
+
+import utils.duel
+import utils.path
+
+MANIFEST_FILEPATH = pathlib.Path('.pipeline.json')
+
+Stage = collections.namedtuple('Stage', ['name', 'params', 'outputs', 'run'])
+Stage.__doc__ = '''
+A step of the DUEL pipeline.
+
+name: unique name of the stage.
+params: JSON serialisable dict of the parameters the outputs depend on.
+outputs: function (session, part) -> list of output paths of that part.
+run: function (session, parts, audio) that generates the outputs of the
+     given parts. audio is a SessionAudio, shared between the stages.
+'''
+
+
+class SessionAudio:
+    '''
+    Memory maps the session audio on first use, and shares it between all
+    the stages that run on a session.
+    '''
+    def __init__(self, session):
+        self._session = session
+        self._loaded = None
+
+    def load(self):
+        if self._loaded is None:
+            self._loaded = utils.duel.load_samples(self._session)
+        return self._loaded
+
+    def part(self, part):
+        '''
+        Float samples of a part, and the sample rate. Only the part is read
+        into memory.
+        '''
+        samples, sample_rate = self.load()
+        return utils.duel.part_samples(samples, sample_rate, part), sample_rate
+
+
+def signature(stage, session):
+    '''
+    Everything the outputs of a stage for a session depend on.
+    '''
+    return {
+        'stage': stage.name,
+        'params': stage.params,
+        'audio': utils.path.file_signature(session['audio_filepath']),
+        'annotations': utils.path.file_signature(session['textgrid_filepath']),
+    }
+
+
+def load_manifest():
+    if MANIFEST_FILEPATH.exists():
+        return json.loads(MANIFEST_FILEPATH.read_text())
+    return {}
+
+
+def save_manifest(manifest):
+    tmp_filepath = MANIFEST_FILEPATH.with_suffix('.tmp')
+    tmp_filepath.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    tmp_filepath.replace(MANIFEST_FILEPATH)
+
+
+def stale_parts(stage, session, manifest):
+    '''
+    Parts with missing outputs, or outputs generated from other inputs
+    or parameters.
+    '''
+    current = signature(stage, session)
+    return [
+        part for part in session['parts']
+        if any(
+            not filepath.exists() or manifest.get(str(filepath)) != current
+            for filepath in stage.outputs(session, part)
+        )
+    ]
+
+
+def _run_session(session, work):
+    audio = SessionAudio(session)
+    for stage, parts in work:
+        stage.run(session, parts, audio)
+
+
+def run(stages, processes=None):
+    '''
+    Run the stages on all the sessions, one session per process.
+    Outputs that are up to date (according to the manifest) are skipped.
+    '''
+    manifest = load_manifest()
+    with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+        futures = {}
+        for session in utils.duel.load_sessions_gen():
+            work = []
+            for stage in stages:
+                parts = stale_parts(stage, session, manifest)
+                for part in parts:
+                    for filepath in stage.outputs(session, part):
+                        filepath.parent.mkdir(parents=True, exist_ok=True)
+                if parts:
+                    work.append((stage, parts))
+            if work:
+                future = executor.submit(_run_session, session, work)
+                futures[future] = (session, work)
+
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
+            session, work = futures[future]
+            for stage, parts in work:
+                current = signature(stage, session)
+                for part in parts:
+                    for filepath in stage.outputs(session, part):
+                        manifest[str(filepath)] = current
+            # Save as sessions complete, so an interrupted run can resume
+            save_manifest(manifest)
@@ -0,0 +1,55 @@
+import numpy as np
+
+# Precision of time comparisons in tgt (tgt.core.Time)
+TGT_PRECISION = 0.0001
+
+
+def rasterize(starts, ends, timestamps, tolerance=0):
+    '''
+    Return the index of the interval containing each of the timestamps,
+    or -1 if none does. Intervals must be sorted and non-overlapping, and
+    contain their start and end times (up to tolerance at the end). Both
+    the intervals and the timestamps are processed in one vectorized pass.
+
+    >>> rasterize([0, 1], [0.5, 1.2], np.arange(6) / 4)
+    array([ 0,  0,  0, -1,  1, -1])
+    '''
+    starts = np.asarray(starts, dtype=float)
+    ends = np.asarray(ends, dtype=float)
+    timestamps = np.asarray(timestamps, dtype=float)
+    # The first interval that doesn't end before each timestamp
+    indices = np.searchsorted(ends, timestamps - tolerance, side='left')
+    inside = indices < len(ends)
+    inside[inside] = timestamps[inside] >= starts[indices[inside]]
+    return np.where(inside, indices, -1)
+
+
+def frame_timestamps(end_time, sample_rate):
+    '''
+    Timestamps of the frames from 0 up to end_time (inclusive), computed
+    from integer frame indices to avoid accumulating floating point errors.
+
+    >>> frame_timestamps(1.2, sample_rate=4)
+    array([0.  , 0.25, 0.5 , 0.75, 1.  ])
+    '''
+    timestamps = np.arange(int(end_time * sample_rate) + 2) / sample_rate
+    return timestamps[timestamps <= end_time]
+
+
+def tier_to_arrays(tier):
+    '''
+    Return the start and end times of the annotations in a tgt tier.
+    '''
+    starts = np.array([a.start_time for a in tier], dtype=float)
+    ends = np.array([a.end_time for a in tier], dtype=float)
+    return starts, ends
+
+
+def rasterize_tier(tier, timestamps):
+    '''
+    Boolean array that is True when there is an annotation in the tier
+    at each timestamp. Same as checking `tier.get_annotations_by_time`
+    for each timestamp, but in one pass.
+    '''
+    starts, ends = tier_to_arrays(tier)
+    return rasterize(starts, ends, timestamps, tolerance=TGT_PRECISION) >= 0
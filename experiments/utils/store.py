@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import pathlib
+
+import numpy as np
+
+from . import path
+
+STORE_DIR = pathlib.Path('cache') / 'features'
+MAX_BYTES = 2 * 1024 ** 3
+
+
+class FeatureStore:
+    '''
+    Content addressed store of feature arrays. An array is keyed on the
+    session part it was extracted from (including the raw audio file
+    signature), the extractor name, and the extraction parameters, so
+    variants extracted with different parameters are kept side by side.
+
+    Arrays are loaded memory mapped. When the store grows beyond max_bytes
+    the least recently used arrays are evicted.
+
+    >>> import tempfile
+    >>> root = pathlib.Path(tempfile.mkdtemp())
+    >>> store = FeatureStore(root / 'store', max_bytes=1024)
+    >>> session = {'name': 'r1', 'audio_filepath': root / 'r1.wav'}
+    >>> session['audio_filepath'].write_bytes(b'RIFF')
+    4
+    >>> part = {'name': 'p1', 'start_time': 0, 'end_time': 1}
+    >>> store.get_or_compute(session, part, 'ones', {'n': 3}, lambda: np.ones(3))
+    memmap([1., 1., 1.])
+    >>> store.get_or_compute(session, part, 'ones', {'n': 3}, lambda: 1 / 0)
+    memmap([1., 1., 1.])
+    '''
+    def __init__(self, root=STORE_DIR, max_bytes=MAX_BYTES):
+        self._root = pathlib.Path(root)
+        self._max_bytes = max_bytes
+
+    @staticmethod
+    def describe(session, part, extractor, params):
+        '''
+        Everything an array depends on, as a JSON serialisable dict.
+        '''
+        return {
+            'session': session['name'],
+            'audio': path.file_signature(session['audio_filepath']),
+            'part': [part['name'], part['start_time'], part['end_time']],
+            'extractor': extractor,
+            'params': params,
+        }
+
+    def filepath(self, session, part, extractor, params):
+        description = self.describe(session, part, extractor, params)
+        encoded = json.dumps(description, sort_keys=True).encode()
+        key = hashlib.sha1(encoded).hexdigest()
+        return self._root / extractor / f'{key}.npy'
+
+    def load(self, session, part, extractor, params):
+        '''
+        Return the memory mapped array, or None if it isn't stored.
+        '''
+        filepath = self.filepath(session, part, extractor, params)
+        try:
+            array = np.load(filepath, mmap_mode='r')
+        except FileNotFoundError:
+            return None
+        os.utime(filepath)  # Mark as recently used
+        return array
+
+    def save(self, session, part, extractor, params, array):
+        filepath = self.filepath(session, part, extractor, params)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        description = self.describe(session, part, extractor, params)
+        filepath.with_suffix('.json').write_text(
+            json.dumps(description, indent=1, sort_keys=True)
+        )
+        # Write and rename, so concurrent readers never see partial arrays
+        tmp_filepath = filepath.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_filepath, 'wb') as f:
+            np.save(f, array)
+        tmp_filepath.replace(filepath)
+        self.evict(keep=filepath)
+
+    def get_or_compute(self, session, part, extractor, params, compute):
+        '''
+        Load the array if stored, otherwise store the result of compute().
+        '''
+        array = self.load(session, part, extractor, params)
+        if array is None:
+            self.save(session, part, extractor, params, compute())
+            array = self.load(session, part, extractor, params)
+        return array
+
+    def evict(self, keep=None):
+        '''
+        Delete least recently used arrays until the store fits in max_bytes.
+        '''
+        entries = []
+        for filepath in self._root.glob('*/*.npy'):
+            try:
+                stat = filepath.stat()
+            except FileNotFoundError:  # Evicted by another process
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, filepath))
+        total = sum(size for _, size, _ in entries)
+        for _, size, filepath in sorted(entries):
+            if total <= self._max_bytes:
+                break
+            if filepath == keep:
+                continue
+            filepath.unlink(missing_ok=True)
+            filepath.with_suffix('.json').unlink(missing_ok=True)
+            total -= size
@@ -148,3 +148,108 @@ def compute_yin(sig, sample_rate, f0_min=100, f0_max=500, harmo_thresh=0.1):
     if p != 0:
         return sample_rate / p
     return 0.0
+
+
+def differenceFunctionBatch(frames, tau_max):
+    """
+    Compute difference function of every frame (row) of frames.
+
+    Same as differenceFunction, but all the frames are transformed with a single 2D FFT.
+
+    :param frames: audio data, one frame per row
+    :param tau_max: integration window size
+    :return: difference function, one frame per row
+    :rtype: np.ndarray
+    """
+
+    x = np.array(frames, np.float64)
+    w = x.shape[-1]
+    tau_max = min(tau_max, w)
+    zeros = np.zeros((len(x), 1))
+    x_cumsum = np.concatenate((zeros, (x * x).cumsum(axis=-1)), axis=-1)
+    size = w + tau_max
+    p2 = (size // 32).bit_length()
+    nice_numbers = (16, 18, 20, 24, 25, 27, 30, 32)
+    size_pad = min(n * 2 ** p2 for n in nice_numbers if n * 2 ** p2 >= size)
+    fc = np.fft.rfft(x, size_pad, axis=-1)
+    conv = np.fft.irfft(fc * fc.conjugate(), axis=-1)[:, :tau_max]
+    return x_cumsum[:, w:w - tau_max:-1] + x_cumsum[:, w:w + 1] - x_cumsum[:, :tau_max] - 2 * conv
+
+
+def cumulativeMeanNormalizedDifferenceFunctionBatch(df, N):
+    """
+    Compute cumulative mean normalized difference function (CMND) of every frame (row) of df.
+
+    :param df: Difference function, one frame per row
+    :param N: length of data
+    :return: cumulative mean normalized difference function, one frame per row
+    :rtype: np.ndarray
+    """
+
+    cmndf = df[:, 1:] * np.arange(1, N) / np.cumsum(df[:, 1:], axis=-1).astype(float)
+    return np.concatenate((np.ones((len(df), 1)), cmndf), axis=-1)
+
+
+def getPitchBatch(cmdf, tau_min, tau_max, harmo_th=0.1):
+    """
+    Return fundamental period of every frame (row) based on CMND function.
+
+    Vectorized version of getPitch: find the first value under the threshold,
+    and then follow the dip down to its local minimum.
+
+    :param cmdf: Cumulative Mean Normalized Difference function, one frame per row
+    :param tau_min: minimum period for speech
+    :param tau_max: maximum period for speech
+    :param harmo_th: harmonicity threshold to determine if it is necessary to compute pitch frequency
+    :return: fundamental periods, 0 for unvoiced frames
+    :rtype: np.ndarray
+    """
+    taus = np.arange(tau_max)
+    under_threshold = cmdf[:, tau_min:tau_max] < harmo_th
+    voiced = under_threshold.any(axis=-1)
+    first = tau_min + under_threshold.argmax(axis=-1)
+    # Stop at tau when cmdf[tau + 1] doesn't descend, or at the last tau
+    stops = np.ones((len(cmdf), tau_max), dtype=bool)
+    stops[:, :-1] = ~(cmdf[:, 1:tau_max] < cmdf[:, :tau_max - 1])
+    stops &= taus >= first[:, np.newaxis]
+    return np.where(voiced, stops.argmax(axis=-1), 0)
+
+
+def compute_yin_batch(frames, sample_rate, f0_min=100, f0_max=500, harmo_thresh=0.1):
+    """
+
+    Compute the Yin Algorithm for every frame (row) of frames at once. Return fundamental frequencies.
+
+    :param frames: Audio signal, one frame per row (2D array)
+    :param sample_rate: sampling rate (int)
+    :param f0_min: Minimum fundamental frequency that can be detected (hertz)
+    :param f0_max: Maximum fundamental frequency that can be detected (hertz)
+    :param harmo_thresh: Threshold of detection. The yalgorithmù return the first minimum of the CMND fubction below this treshold.
+
+    :returns: Fundamental frequencies, 0 for unvoiced frames (np.ndarray)
+
+    Same as compute_yin on every frame. Here for two voiced frames (a tone, and a tone
+    with a harmonic) and an unvoiced one (white noise):
+
+    >>> t = np.arange(800) / 16000
+    >>> frames = np.array([
+    ...     np.sin(2 * np.pi * 200 * t),
+    ...     np.sin(2 * np.pi * 150 * t) + 0.5 * np.sin(2 * np.pi * 300 * t),
+    ...     np.random.default_rng(0).standard_normal(800),
+    ... ])
+    >>> batch = compute_yin_batch(frames, 16000)
+    >>> batch.round(1)
+    array([200. , 149.5,   0. ])
+    >>> np.array_equal(batch, [compute_yin(frame, 16000) for frame in frames])
+    True
+    """
+
+    tau_min = int(sample_rate / f0_max)
+    tau_max = int(sample_rate / f0_min)
+
+    df = differenceFunctionBatch(frames, tau_max)
+    cmdf = cumulativeMeanNormalizedDifferenceFunctionBatch(df, tau_max)
+    p = getPitchBatch(cmdf, tau_min, tau_max, harmo_thresh)
+
+    with np.errstate(divide='ignore'):
+        return np.where(p != 0, sample_rate / p, 0.0)
@@ -1,6 +1,24 @@
-import audioop
+import struct
+import time
 
-from . import core
+import numpy as np
+
+from . import core, latency, stats
+from .bank import DetectorBank
+
+_SNAPSHOT_MAGIC = b'FCDS'
+_SNAPSHOT_VERSION = 2
+_SNAPSHOT_HEADER = struct.Struct('<4sB')
+# sample_rate, sample_width, sample_format, buffer_duration, hop_duration,
+# cutoff_freq, hysteresis, filter_order, num_of_interactants, previous
+# floor holder (-1 when undecided), warm start pending, pending samples
+# dtype and count
+_SNAPSHOT_STATE = struct.Struct('<dBBddddBii?4sI')
+_SAMPLE_FORMATS = ('int', 'float')
+
+
+def _buffers_rms(buffers):
+    return core.rms(buffers, axis=1)
 
 
 class FloorControlDetector:
@@ -12,15 +30,291 @@ class FloorControlDetector:
         cutoff_freq=0.35,
         hysteresis=0.1,
         num_of_interactants=2,
+        sample_format='int',
+        instrument=False,
+        filter_order=2,
+        latency_budget=None,
+        hop_duration=None,
+        warm_start=False,
     ):
+        '''
+        The RMS is calculated over buffer_duration seconds of audio, every
+        hop_duration seconds (buffer_duration by default, that is, no
+        overlap). The floor holder is decided every hop.
+
+        With instrument, the detector records per stage timing and counters,
+        see `stats`. Otherwise there is no instrumentation overhead at all.
+
+        With a latency_budget (in seconds) the filter order and cutoff
+        frequency are chosen to switch floor holders within that time,
+        instead of using cutoff_freq and filter_order. See `latency`.
+
+        With warm_start, the filter starts from the RMS of the first buffer,
+        instead of from silence, which skips the transient at the start.
+        See also `snapshot` and `restore` to carry the state of a detector
+        over to another process.
+        '''
+        if hop_duration is None:
+            hop_duration = buffer_duration
+        if not 0 < hop_duration <= buffer_duration:
+            raise ValueError('hop_duration must be positive and up to buffer_duration')
+        if latency_budget is not None:
+            filter_order, cutoff_freq = latency.choose_filter(
+                latency_budget, hysteresis, sample_rate=1 / hop_duration
+            )
+        self._sample_rate = sample_rate
+        self._buffer_duration = buffer_duration
+        self._hop_duration = hop_duration
+        self._cutoff_freq = cutoff_freq
+        self._filter_order = filter_order
+        self._hysteresis = hysteresis
         self._sample_width = sample_width
-        self._filters = [
-            core.Filter(cutoff_freq=cutoff_freq, sample_rate=1 / buffer_duration)
-            for _ in range(num_of_interactants)
-        ]
-        self._argmax = core.StableArgmax(hysteresis=hysteresis)
+        self._sample_format = sample_format
+        self._num_of_interactants = num_of_interactants
+        self._buffer_size = int(sample_rate * buffer_duration)
+        self._hop_size = int(sample_rate * hop_duration)
+        # Samples received by `feed` that don't complete a buffer yet
+        self._pending = None
+        self._pending_size = 0
+        self._filter = core.MultiChannelFilter(
+            cutoff_freq=cutoff_freq,
+            sample_rate=1 / hop_duration,
+            channels=num_of_interactants,
+            order=filter_order,
+            warm_start=warm_start,
+            instrument=instrument,
+        )
+        self._argmax = core.StableArgmax(hysteresis=hysteresis, instrument=instrument)
+        self._frame_rms = core.frame_rms
+        self._buffers_rms = _buffers_rms
+        self._stats = None
+        if instrument:
+            self._instrument()
+
+    def _instrument(self):
+        '''
+        Time every stage, and bind the instrumented methods instead of
+        checking on each call.
+        '''
+        timers = {
+            'to_samples': stats.StageTimer(),
+            'rms': stats.StageTimer(),
+            'filter': self._filter.timer,
+            'argmax': self._argmax.timer,
+        }
+        to_samples, rms = timers['to_samples'], timers['rms']
+        self._fragments_to_samples = to_samples.wrap(self._fragments_to_samples)
+        self._to_buffers = to_samples.wrap(self._to_buffers)
+        self._frame_rms = rms.wrap(self._frame_rms)
+        self._buffers_rms = rms.wrap(self._buffers_rms)
+        self._stats = stats.Stats(self._hop_duration, timers)
+        self.process = self._process_instrumented
+        self.process_array = self._process_array_instrumented
+
+    def _to_samples(self, fragment, channels):
+        return core.to_samples(
+            fragment,
+            self._sample_width,
+            sample_format=self._sample_format,
+            channels=channels,
+        )
 
     def process(self, fragments):
-        rms = [audioop.rms(f, self._sample_width) for f in fragments]
-        smooth = [f.process(s) for f, s in zip(self._filters, rms)]
+        '''
+        Process one buffer (call it every hop). fragments is either a list
+        with one fragment per interactant, or a single fragment of
+        interleaved samples. Fragments can be bytes-like objects or numpy
+        arrays.
+        '''
+        samples = self._fragments_to_samples(fragments)
+        rms = self._frame_rms(samples)
+        smooth = self._filter.process(rms)
         return self._argmax.process(smooth)
+
+    def _fragments_to_samples(self, fragments):
+        if isinstance(fragments, (list, tuple)):
+            return np.column_stack(
+                [self._to_samples(f, channels=1) for f in fragments]
+            )
+        return self._to_samples(fragments, self._num_of_interactants)
+
+    def process_array(self, samples):
+        '''
+        Process a whole (n_samples, n_channels) array of samples, or the
+        equivalent interleaved bytes-like object, at once. Returns the floor
+        holder of every complete buffer (one per hop), with NaN where the
+        floor is still undecided. Equivalent to calling `process` buffer
+        after buffer, and the detector state carries on to following calls.
+        '''
+        buffers = self._to_buffers(samples)
+        rms = self._buffers_rms(buffers)
+        smooth = self._filter.process_array(rms)
+        return self._argmax.process_array(smooth)
+
+    def _to_buffers(self, samples):
+        '''
+        (buffers, buffer_size, channels) view of the buffers starting every
+        hop.
+        '''
+        samples = self._to_samples(samples, self._num_of_interactants)
+        n_buffers = self._n_buffers(len(samples))
+        return np.lib.stride_tricks.as_strided(
+            samples,
+            shape=(n_buffers, self._buffer_size, samples.shape[1]),
+            strides=(self._hop_size * samples.strides[0],) + samples.strides,
+            writeable=False,
+        )
+
+    def _n_buffers(self, n_samples):
+        if n_samples < self._buffer_size:
+            return 0
+        return (n_samples - self._buffer_size) // self._hop_size + 1
+
+    def feed(self, fragments):
+        '''
+        Process fragments of any length, in the same formats as `process`.
+        Samples that don't complete a buffer are kept for the next call.
+        Returns the floor holders of all the buffers completed by this
+        call, as a list (None for undecided), which may be empty.
+        '''
+        samples = self._fragments_to_samples(fragments)
+        if self._pending is None:
+            self._pending = np.empty((self._buffer_size, samples.shape[1]), samples.dtype)
+        if self._pending_size:
+            samples = np.concatenate([self._pending[:self._pending_size], samples])
+        n_buffers = self._n_buffers(len(samples))
+        if n_buffers == 1:
+            results = [self.process(samples[:self._buffer_size])]
+        elif n_buffers > 1:
+            used = (n_buffers - 1) * self._hop_size + self._buffer_size
+            results = [
+                None if np.isnan(x) else int(x)
+                for x in self.process_array(samples[:used]).tolist()
+            ]
+        else:
+            results = []
+        rest = samples[n_buffers * self._hop_size:]
+        self._pending_size = len(rest)
+        self._pending[:len(rest)] = rest
+        return results
+
+    def _process_instrumented(self, fragments):
+        start_ns = time.perf_counter_ns()
+        floor_holder = FloorControlDetector.process(self, fragments)
+        self._stats.record(floor_holder, start_ns, time.perf_counter_ns())
+        return floor_holder
+
+    def _process_array_instrumented(self, samples):
+        start_ns = time.perf_counter_ns()
+        floor_holders = FloorControlDetector.process_array(self, samples)
+        self._stats.record_array(floor_holders, start_ns, time.perf_counter_ns())
+        return floor_holders
+
+    def latency(self):
+        '''
+        Decision latency of the detector, computed from its filter: the
+        group delay of the filter at 0Hz, and the switch lag (seconds from
+        a turn change to reporting the new floor holder) measured on a
+        synthetic turn change. Also includes the filter order and cutoff
+        frequency, which may have been chosen for a latency budget.
+        '''
+        sample_rate = 1 / self._hop_duration
+        b, a = latency.butter(self._cutoff_freq, sample_rate, self._filter_order)
+        return {
+            'cutoff_freq': self._cutoff_freq,
+            'filter_order': self._filter_order,
+            'group_delay': latency.dc_group_delay(b, a, sample_rate),
+            'switch_lag': latency.switch_lag(b, a, self._hysteresis, sample_rate),
+        }
+
+    def snapshot(self):
+        '''
+        Serialize the parameters and the full state of the detector (filter
+        state, floor holder, and samples kept by `feed`) to bytes. A
+        detector restored from them continues exactly as this one would.
+        Instrumentation counters are not included.
+        '''
+        previous = self._argmax._previous
+        pending = self._pending[:self._pending_size] if self._pending_size else None
+        state = _SNAPSHOT_STATE.pack(
+            self._sample_rate,
+            self._sample_width,
+            _SAMPLE_FORMATS.index(self._sample_format),
+            self._buffer_duration,
+            self._hop_duration,
+            self._cutoff_freq,
+            self._hysteresis,
+            self._filter_order,
+            self._num_of_interactants,
+            -1 if previous is None else previous,
+            self._filter.warm_start_pending,
+            b'' if pending is None else pending.dtype.str.encode(),
+            self._pending_size,
+        )
+        parts = [
+            _SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, _SNAPSHOT_VERSION),
+            state,
+            self._filter._zi.astype('<f8').tobytes(),
+        ]
+        if pending is not None:
+            parts.append(pending.tobytes())
+        return b''.join(parts)
+
+    @classmethod
+    def restore(cls, data, instrument=False):
+        '''
+        Create a detector from the bytes returned by `snapshot`.
+        '''
+        data = memoryview(data)
+        magic, version = _SNAPSHOT_HEADER.unpack_from(data)
+        if magic != _SNAPSHOT_MAGIC or version != _SNAPSHOT_VERSION:
+            raise ValueError(
+                f'Unsupported snapshot: {bytes(magic)!r}, version {version}'
+            )
+        offset = _SNAPSHOT_HEADER.size
+        (
+            sample_rate, sample_width, sample_format, buffer_duration,
+            hop_duration, cutoff_freq, hysteresis, filter_order,
+            num_of_interactants, previous, warm_start, pending_dtype,
+            pending_size,
+        ) = _SNAPSHOT_STATE.unpack_from(data, offset)
+        offset += _SNAPSHOT_STATE.size
+        detector = cls(
+            sample_rate=sample_rate,
+            sample_width=sample_width,
+            sample_format=_SAMPLE_FORMATS[sample_format],
+            buffer_duration=buffer_duration,
+            hop_duration=hop_duration,
+            cutoff_freq=cutoff_freq,
+            hysteresis=hysteresis,
+            filter_order=filter_order,
+            num_of_interactants=num_of_interactants,
+            instrument=instrument,
+            warm_start=warm_start,
+        )
+        zi = detector._filter._zi
+        zi[:] = np.frombuffer(data, '<f8', zi.size, offset).reshape(zi.shape)
+        offset += zi.nbytes
+        detector._argmax._previous = None if previous == -1 else previous
+        if pending_size:
+            pending = np.frombuffer(
+                data, pending_dtype.rstrip(b'\0').decode(),
+                pending_size * num_of_interactants, offset,
+            ).reshape(pending_size, num_of_interactants)
+            detector._pending = np.empty(
+                (detector._buffer_size, num_of_interactants), pending.dtype
+            )
+            detector._pending[:pending_size] = pending
+            detector._pending_size = pending_size
+        return detector
+
+    def stats(self):
+        '''
+        Snapshot of the instrumentation counters: frames processed, seconds
+        spent in every stage, frames behind real time (current and maximum),
+        floor switches, and undecided frames and seconds. The detector must
+        be created with instrument=True.
+        '''
+        if self._stats is None:
+            raise ValueError('The detector is not instrumented')
+        return self._stats.snapshot()
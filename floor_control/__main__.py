@@ -0,0 +1,252 @@
+'''
+Score a multichannel recording, writing the floor holder intervals.
+
+    $ python -m floor_control dialogue.wav -o floor.csv
+    $ sox dialogue.mp3 -t raw -b 16 -e signed - | python -m floor_control - \\
+        --raw --sample-rate 44100 --sample-width 2 --channels 2
+
+The recording is streamed in blocks, so memory use doesn't depend on its
+length. WAV files can hold 16, 24, or 32-bit integer or 32-bit float
+samples, with a plain or a WAVE_FORMAT_EXTENSIBLE header. A trailing
+partial frame is ignored.
+'''
+import argparse
+import csv
+import struct
+import sys
+
+import numpy as np
+
+from . import FloorControlDetector, events
+
+BLOCK_DURATION = 60  # Seconds of audio read at once
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_IEEE_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+_WAV_SAMPLE_FORMATS = {
+    (_WAVE_FORMAT_PCM, 2): 'int',
+    (_WAVE_FORMAT_PCM, 3): 'int',
+    (_WAVE_FORMAT_PCM, 4): 'int',
+    (_WAVE_FORMAT_IEEE_FLOAT, 4): 'float',
+}
+_CHUNK_HEADER = struct.Struct('<4sI')
+_FMT = struct.Struct('<HHIIHH')
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m floor_control',
+        description='Detect the floor holder in a multichannel recording.',
+    )
+    parser.add_argument(
+        'input',
+        help='WAV file of 16, 24, or 32-bit integer, or 32-bit float samples '
+        '(or raw PCM with --raw), "-" for stdin',
+    )
+    parser.add_argument(
+        '-o', '--output',
+        help='.csv or .npy file for the floor holder intervals, '
+        'CSV to stdout by default',
+    )
+    raw = parser.add_argument_group('raw PCM input')
+    raw.add_argument('--raw', action='store_true', help='input is raw PCM')
+    raw.add_argument('--sample-rate', type=int)
+    raw.add_argument('--sample-width', type=int, help='in bytes')
+    raw.add_argument('--sample-format', choices=['int', 'float'], default='int')
+    raw.add_argument('--channels', type=int)
+    model = parser.add_argument_group('model parameters')
+    model.add_argument('--buffer-duration', type=float, default=0.02)
+    model.add_argument(
+        '--hop-duration', type=float,
+        help='seconds between buffers (default: --buffer-duration)',
+    )
+    model.add_argument('--cutoff-freq', type=float, default=0.35)
+    model.add_argument('--hysteresis', type=float, default=0.1)
+    model.add_argument('--filter-order', type=int, default=2)
+    model.add_argument(
+        '--latency-budget', type=float,
+        help='seconds, choose the filter order and cutoff frequency to switch '
+        'within that time (overrides --cutoff-freq and --filter-order)',
+    )
+    model.add_argument(
+        '--warm-start', action='store_true',
+        help='start the filter from the first buffer instead of from silence',
+    )
+    parser.add_argument(
+        '--block-duration', type=float, default=BLOCK_DURATION,
+        help='seconds of audio to process at once',
+    )
+    args = parser.parse_args(args)
+    if args.raw and None in (args.sample_rate, args.sample_width, args.channels):
+        parser.error(
+            '--raw requires --sample-rate, --sample-width, and --channels'
+        )
+    return args
+
+
+class RawReader:
+    '''
+    Minimal wave.Wave_read look-alike for raw PCM streams.
+    '''
+    def __init__(self, file, sample_rate, sample_width, channels):
+        self._file = file
+        self._sample_rate = sample_rate
+        self._sample_width = sample_width
+        self._channels = channels
+
+    def getframerate(self):
+        return self._sample_rate
+
+    def getsampwidth(self):
+        return self._sample_width
+
+    def getnchannels(self):
+        return self._channels
+
+    def _read(self, size):
+        return self._file.read(size)
+
+    def readframes(self, n):
+        frame_size = self._sample_width * self._channels
+        data = self._read(n * frame_size)
+        partial = len(data) % frame_size
+        if partial:  # Only at the end of the stream
+            print(
+                f'Ignoring a trailing partial frame of {partial} bytes',
+                file=sys.stderr,
+            )
+            data = data[:-partial]
+        return data
+
+
+class WavReader(RawReader):
+    '''
+    Streaming WAV reader. Unlike the wave module, it reads float and
+    WAVE_FORMAT_EXTENSIBLE files, and it doesn't seek, so it reads from
+    pipes too. Raises ValueError for unsupported files.
+    '''
+    def __init__(self, file):
+        riff, _ = _CHUNK_HEADER.unpack(self._read_exactly(file, _CHUNK_HEADER.size))
+        if riff != b'RIFF' or self._read_exactly(file, 4) != b'WAVE':
+            raise ValueError('Not a WAV file')
+        fmt = None
+        while True:
+            chunk_id, size = _CHUNK_HEADER.unpack(
+                self._read_exactly(file, _CHUNK_HEADER.size)
+            )
+            if chunk_id == b'data':
+                break
+            chunk = self._read_exactly(file, size + size % 2)  # Padded to even
+            if chunk_id == b'fmt ':
+                fmt = chunk
+        if fmt is None or len(fmt) < _FMT.size:
+            raise ValueError('WAV file without a valid fmt chunk')
+        format_tag, channels, sample_rate, _, block_align, _ = _FMT.unpack_from(fmt)
+        if format_tag == _WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+            # The sub format GUID starts with the format tag
+            (format_tag,) = struct.unpack_from('<H', fmt, 24)
+        sample_width = block_align // channels
+        if (format_tag, sample_width) not in _WAV_SAMPLE_FORMATS:
+            raise ValueError(
+                f'Unsupported WAV format: {format_tag:#06x}, {sample_width} bytes '
+                'per sample'
+            )
+        super().__init__(file, sample_rate, sample_width, channels)
+        self.sample_format = _WAV_SAMPLE_FORMATS[format_tag, sample_width]
+        # Streamed files may not know their size
+        self._remaining = None if size in (0, 0xFFFFFFFF) else size
+
+    @staticmethod
+    def _read_exactly(file, size):
+        data = file.read(size)
+        if len(data) < size:
+            raise ValueError('Truncated WAV header')
+        return data
+
+    def _read(self, size):
+        if self._remaining is None:
+            return self._file.read(size)
+        data = self._file.read(min(size, self._remaining))
+        self._remaining -= len(data)
+        return data
+
+
+def score(reader, detector, block_size, hop_duration):
+    '''
+    Generate (start_time, end_time, floor_holder) intervals from a reader,
+    with NaN for undecided intervals.
+    '''
+    def blocks_gen():
+        while True:
+            block = reader.readframes(block_size)
+            if not block:
+                return
+            # None (undecided) becomes NaN
+            yield np.array(detector.feed(block), dtype=float)
+
+    for start, end, holder in events.intervals_gen(blocks_gen()):
+        yield start * hop_duration, end * hop_duration, holder
+
+
+def write_csv(intervals, file):
+    writer = csv.writer(file)
+    writer.writerow(['start_time', 'end_time', 'floor_holder'])
+    for start, end, holder in intervals:
+        writer.writerow([
+            round(start, 6),
+            round(end, 6),
+            '' if np.isnan(holder) else int(holder),
+        ])
+
+
+def main(args=None):
+    args = parse_args(args)
+
+    input_file = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    with input_file:
+        if args.raw:
+            reader = RawReader(
+                input_file, args.sample_rate, args.sample_width, args.channels
+            )
+            sample_format = args.sample_format
+        else:
+            try:
+                reader = WavReader(input_file)
+            except ValueError as e:
+                sys.exit(f'{args.input}: {e}')
+            sample_format = reader.sample_format
+        if reader.getnchannels() < 2:
+            sys.exit(
+                f'{args.input}: needs at least 2 channels, one per interactant '
+                f'(got {reader.getnchannels()})'
+            )
+
+        detector = FloorControlDetector(
+            sample_rate=reader.getframerate(),
+            sample_width=reader.getsampwidth(),
+            buffer_duration=args.buffer_duration,
+            cutoff_freq=args.cutoff_freq,
+            hysteresis=args.hysteresis,
+            num_of_interactants=reader.getnchannels(),
+            sample_format=sample_format,
+            filter_order=args.filter_order,
+            latency_budget=args.latency_budget,
+            hop_duration=args.hop_duration,
+            warm_start=args.warm_start,
+        )
+        hop_duration = args.hop_duration or args.buffer_duration
+        block_size = max(1, int(reader.getframerate() * args.block_duration))
+        intervals = score(reader, detector, block_size, hop_duration)
+
+        if args.output is None:
+            write_csv(intervals, sys.stdout)
+        elif args.output.endswith('.npy'):
+            np.save(args.output, np.array(list(intervals)).reshape(-1, 3))
+        else:
+            with open(args.output, 'w', newline='') as f:
+                write_csv(intervals, f)
+
+
+if __name__ == '__main__':
+    main()
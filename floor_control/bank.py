@@ -0,0 +1,87 @@
+import numpy as np
+import scipy.signal as ss
+
+from . import core
+
+
+class DetectorBank:
+    '''
+    Floor control detection for many sessions (conversations) at once.
+
+    The filter and hysteresis states of all sessions are kept in contiguous
+    arrays, so each tick is processed with a few vectorized operations
+    regardless of the number of sessions. Sessions are identified by the
+    integer returned from `add_session`. Removed sessions leave a free
+    slot that is reused by the next added session, and the arrays only
+    grow (doubling their capacity) when all slots are taken.
+    '''
+    def __init__(
+        self,
+        sample_rate,
+        buffer_duration=0.02,
+        cutoff_freq=0.35,
+        hysteresis=0.1,
+        num_of_interactants=2,
+        filter_order=2,
+        capacity=16,
+    ):
+        self._buffer_size = int(sample_rate * buffer_duration)
+        self._num_of_interactants = num_of_interactants
+        self._hysteresis = hysteresis
+        self._b, self._a = ss.butter(
+            N=filter_order, Wn=cutoff_freq, fs=1 / buffer_duration
+        )
+        self._zi = np.zeros((filter_order, capacity, num_of_interactants))
+        self._previous = np.full(capacity, np.nan)
+        self._active = np.zeros(capacity, dtype=bool)
+        self._free = list(range(capacity - 1, -1, -1))
+
+    @property
+    def sessions(self):
+        return np.flatnonzero(self._active)
+
+    def add_session(self):
+        if not self._free:
+            self._grow()
+        session_id = self._free.pop()
+        self._zi[:, session_id] = 0
+        self._previous[session_id] = np.nan
+        self._active[session_id] = True
+        return session_id
+
+    def remove_session(self, session_id):
+        if not self._active[session_id]:
+            raise KeyError(session_id)
+        self._active[session_id] = False
+        self._free.append(session_id)
+
+    def _grow(self):
+        capacity = len(self._active)
+        self._zi = np.concatenate([self._zi, np.zeros_like(self._zi)], axis=1)
+        self._previous = np.concatenate(
+            [self._previous, np.full(capacity, np.nan)]
+        )
+        self._active = np.concatenate(
+            [self._active, np.zeros(capacity, dtype=bool)]
+        )
+        self._free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def process(self, session_ids, samples):
+        '''
+        Process one buffer for each of the given sessions. samples is an
+        integer array with shape (len(session_ids), buffer_size,
+        num_of_interactants). Returns the floor holder of each session,
+        with NaN where the floor is still undecided.
+        '''
+        session_ids = np.asarray(session_ids, dtype=np.intp)
+        if not self._active[session_ids].all():
+            raise KeyError(session_ids[~self._active[session_ids]])
+        rms = core.rms(samples, axis=1)
+        zi = self._zi[:, session_ids]
+        smooth = core.lfilter_step(self._b, self._a, zi, rms)
+        self._zi[:, session_ids] = zi
+        argmax, decided = core.decide(smooth, self._hysteresis)
+        previous = self._previous[session_ids]
+        previous[decided] = argmax[decided]
+        self._previous[session_ids] = previous
+        return previous
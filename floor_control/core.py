@@ -1,29 +1,289 @@
-import audioop
-
 import numpy as np
 import scipy.signal as ss
 
+from . import stats
+
+_INT_DTYPES = {1: '<i1', 2: '<i2', 4: '<i4'}
+_FLOAT_DTYPES = {4: '<f4'}
+
+
+def to_samples(fragment, sample_width, sample_format='int', channels=1):
+    '''
+    View interleaved PCM data, either bytes-like or a numpy array, as a
+    (n_samples, channels) array. No copy is made, except for 24-bit
+    samples that have no numpy equivalent. Like audioop, 8-bit samples
+    are signed.
+    '''
+    if isinstance(fragment, np.ndarray) and fragment.dtype != np.uint8:
+        return fragment.reshape(-1, channels)
+    if sample_format == 'int' and sample_width == 3:
+        raw = np.frombuffer(fragment, dtype=np.uint8).reshape(-1, 3)
+        padded = np.zeros((len(raw), 4), dtype=np.uint8)
+        padded[:, 1:] = raw
+        # Arithmetic shift to sign extend the 24-bit values
+        samples = padded.view('<i4').ravel() >> 8
+    elif sample_format == 'int' and sample_width in _INT_DTYPES:
+        samples = np.frombuffer(fragment, dtype=_INT_DTYPES[sample_width])
+    elif sample_format == 'float' and sample_width in _FLOAT_DTYPES:
+        samples = np.frombuffer(fragment, dtype=_FLOAT_DTYPES[sample_width])
+    else:
+        raise ValueError(
+            f'Unsupported sample format: {sample_format}, {sample_width} bytes'
+        )
+    return samples.reshape(-1, channels)
+
+
+def _finalize_rms(mean_squares, dtype):
+    result = np.sqrt(mean_squares)
+    # Like audioop, truncate the RMS of integer samples
+    if np.issubdtype(dtype, np.integer):
+        result = np.floor(result)
+    return result
+
+
+def rms(samples, axis=-1):
+    '''
+    Vectorized equivalent of `audioop.rms`, along any axis.
+    '''
+    squares = np.square(samples, dtype=np.float64)
+    return _finalize_rms(np.mean(squares, axis=axis), samples.dtype)
+
+
+if hasattr(np, 'vecdot'):
+    _vecdot = np.vecdot
+else:  # numpy < 2.0
+    def _vecdot(a, b):
+        return np.einsum('ij,ij->i', a, b)
+
+
+def frame_rms(samples):
+    '''
+    RMS of each channel of a single (n_samples, channels) frame. Faster
+    than `rms` for small arrays.
+    '''
+    channels = samples.T.astype(np.float64)
+    mean_squares = _vecdot(channels, channels) / len(samples)
+    return _finalize_rms(mean_squares, samples.dtype)
+
+
+# Above that many interactants np.argpartition is faster than a Python loop
+_ARGPARTITION_MIN_SIZE = 64
+
+
+def _top_two(samples):
+    '''
+    Return the argmax, the max and the second largest value of samples,
+    in a single pass.
+    '''
+    if len(samples) >= _ARGPARTITION_MIN_SIZE:
+        samples = np.asarray(samples)
+        next_index, max_index = np.argpartition(samples, -2)[-2:]
+        return max_index, samples[max_index], samples[next_index]
+    if isinstance(samples, np.ndarray):
+        samples = samples.tolist()
+    if samples[1] > samples[0]:
+        argmax, max_, next_ = 1, samples[1], samples[0]
+    else:
+        argmax, max_, next_ = 0, samples[0], samples[1]
+    for i in range(2, len(samples)):
+        value = samples[i]
+        if value > max_:
+            argmax, max_, next_ = i, value, max_
+        elif value > next_:
+            next_ = value
+    return argmax, max_, next_
+
+
+class _Instrumentable:
+    '''
+    Opt-in timing of `process` and `process_array`. The timed methods are
+    bound to the instance, so uninstrumented instances run the plain ones.
+    '''
+    timer = None
+
+    def _instrument(self):
+        self.timer = stats.StageTimer()
+        self.process = self.timer.wrap(self.process)
+        self.process_array = self.timer.wrap(self.process_array)
+
+    def stats(self):
+        '''
+        Calls and seconds spent processing. The instance must be created
+        with instrument=True.
+        '''
+        if self.timer is None:
+            raise ValueError('Not instrumented')
+        return self.timer.snapshot()
 
-class StableArgmax:
-    def __init__(self, hysteresis):
+
+class StableArgmax(_Instrumentable):
+    def __init__(self, hysteresis, instrument=False):
         self._hysteresis = hysteresis
         self._previous = None
+        if instrument:
+            self._instrument()
 
     def process(self, samples):
-        argsort = np.argsort(samples)
-        max_ = samples[argsort[-1]]
-        next_ = samples[argsort[-2]]
+        argmax, max_, next_ = _top_two(samples)
         if next_ and max_ / next_ > (1 + self._hysteresis):
-            self._previous = argsort[-1]
+            self._previous = argmax
         return self._previous
 
+    def process_array(self, samples):
+        '''
+        Process a (n_samples, n_interactants) array at once. Returns the
+        argmax of every row, with NaN instead of None.
+        '''
+        argmax, decided = decide(samples, self._hysteresis)
+        # Forward fill the argmax from the last decided row
+        last_decided = np.where(decided, np.arange(len(argmax)), -1)
+        np.maximum.accumulate(last_decided, out=last_decided)
+        previous = np.nan if self._previous is None else self._previous
+        result = np.where(last_decided >= 0, argmax[last_decided], previous)
+        if len(result) and not np.isnan(result[-1]):
+            self._previous = int(result[-1])
+        return result
+
+
+def decide(samples, hysteresis):
+    '''
+    Vectorized decision rule of `StableArgmax` for a (n, n_interactants)
+    array. Returns the argmax of every row, and whether it passes the
+    hysteresis threshold.
+    '''
+    samples = np.asarray(samples)
+    argmax = samples.argmax(axis=1)
+    next_, max_ = np.partition(samples, -2, axis=1)[:, -2:].T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        decided = (next_ != 0) & (max_ / next_ > (1 + hysteresis))
+    return argmax, decided
+
+
+class Filter(_Instrumentable):
+    '''
+    Butterworth low-pass filter, processing one sample at a time.
 
-class Filter:
-    def __init__(self, cutoff_freq, sample_rate, order=2):
+    The direct-form II transposed update (the one `lfilter` uses) is done
+    with plain floats on the preallocated state, which avoids the overhead
+    of calling `lfilter` for a single sample.
+    '''
+    def __init__(self, cutoff_freq, sample_rate, order=2, instrument=False):
         self._b, self._a = ss.butter(N=order, Wn=cutoff_freq, fs=sample_rate)
+        self._coefficients = list(zip(self._b.tolist(), self._a.tolist()))
         # Initial condition
-        self._zi = ss.lfiltic(self._b, self._a, y=[])
+        self._zi = ss.lfiltic(self._b, self._a, y=[]).tolist()
+        if instrument:
+            self._instrument()
 
     def process(self, sample):
-        result, self._zi = ss.lfilter(self._b, self._a, [sample], zi=self._zi)
-        return result[0]
+        zi = self._zi
+        coefficients = self._coefficients
+        result = zi[0] + coefficients[0][0] * sample
+        for i in range(1, len(zi)):
+            b, a = coefficients[i]
+            zi[i - 1] = zi[i] + sample * b - result * a
+        b, a = coefficients[-1]
+        zi[-1] = sample * b - result * a
+        return result
+
+    def process_array(self, samples):
+        if len(samples) == 0:  # lfilter returns a wrong state for no samples
+            return np.array(samples, dtype=float)
+        result, zi = ss.lfilter(self._b, self._a, samples, zi=self._zi)
+        self._zi[:] = zi.tolist()
+        return result
+
+
+def lfilter_step(b, a, zi, samples):
+    '''
+    Apply one direct-form II transposed step to samples of any shape.
+    The state zi, with shape (order, *samples.shape), is updated in place.
+    '''
+    shape = (-1,) + (1,) * np.ndim(samples)
+    result = zi[0] + b[0] * samples
+    feedforward = samples * b[1:].reshape(shape)
+    feedforward[:-1] += zi[1:]
+    np.subtract(feedforward, result * a[1:].reshape(shape), out=zi)
+    return result
+
+
+class MultiChannelFilter(_Instrumentable):
+    '''
+    Same as `Filter`, but for multiple channels at once. The state of all
+    channels (and all delays) is updated with a few vectorized operations.
+
+    With warm_start, the state is initialized from the first sample of
+    every channel, as if the filter had been fed that sample forever,
+    instead of from zeros. This skips the transient at the start.
+    '''
+    def __init__(
+        self,
+        cutoff_freq,
+        sample_rate,
+        channels,
+        order=2,
+        warm_start=False,
+        instrument=False,
+    ):
+        self._b, self._a = ss.butter(N=order, Wn=cutoff_freq, fs=sample_rate)
+        self._b0 = self._b[0]
+        self._b_tail = self._b[1:, np.newaxis]
+        self._a_tail = self._a[1:, np.newaxis]
+        # Initial condition, one column per channel
+        self._zi = np.zeros((order, channels))
+        self._result = np.empty(channels)
+        self._feedforward = np.empty((order, channels))
+        self._feedback = np.empty((order, channels))
+        if instrument:
+            self._instrument()
+        # The methods to restore after the warm start
+        self._steady = None
+        if warm_start:
+            self._steady = self.process, self.process_array
+            self.process = self._process_warm_start
+            self.process_array = self._process_array_warm_start
+
+    @property
+    def warm_start_pending(self):
+        return self._steady is not None
+
+    def _warm_start(self, samples):
+        self._zi[:] = ss.lfilter_zi(self._b, self._a)[:, np.newaxis] * samples
+        self.process, self.process_array = self._steady
+        self._steady = None
+
+    def _process_warm_start(self, samples):
+        self._warm_start(samples)
+        return self.process(samples)
+
+    def _process_array_warm_start(self, samples):
+        if len(samples) == 0:  # Wait for the first sample
+            return np.array(samples, dtype=float)
+        self._warm_start(samples[0])
+        return self.process_array(samples)
+
+    def process(self, samples):
+        '''
+        Process one sample per channel. Note that the returned array is
+        reused by the next call.
+        '''
+        zi, result = self._zi, self._result
+        feedforward, feedback = self._feedforward, self._feedback
+        np.multiply(self._b0, samples, out=result)
+        np.add(zi[0], result, out=result)
+        np.multiply(samples, self._b_tail, out=feedforward)
+        np.add(zi[1:], feedforward[:-1], out=feedforward[:-1])
+        np.multiply(result, self._a_tail, out=feedback)
+        np.subtract(feedforward, feedback, out=zi)
+        return result
+
+    def process_array(self, samples):
+        '''
+        Process a (n_samples, channels) array.
+        '''
+        if len(samples) == 0:  # lfilter returns a wrong state for no samples
+            return np.array(samples, dtype=float)
+        result, self._zi[:] = ss.lfilter(
+            self._b, self._a, samples, axis=0, zi=self._zi
+        )
+        return result
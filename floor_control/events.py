@@ -0,0 +1,78 @@
+'''
+Compact representations of floor holder sequences: change events and
+run-length encoded intervals. Undecided floor is None (or NaN in arrays).
+'''
+import math
+
+import numpy as np
+
+
+def _is_undecided(floor_holder):
+    return floor_holder is None or (
+        isinstance(floor_holder, float) and math.isnan(floor_holder)
+    )
+
+
+def changes_gen(floor_holders, buffer_duration=1):
+    '''
+    Yield (timestamp, floor_holder, previous) whenever the floor holder
+    changes, with timestamps in buffer_duration units.
+
+    >>> list(changes_gen([None, 0, 0, 1, 1, 1, 0]))
+    [(1, 0, None), (3, 1, 0), (6, 0, 1)]
+    '''
+    previous = None
+    for i, floor_holder in enumerate(floor_holders):
+        if _is_undecided(floor_holder):
+            floor_holder = None
+        if floor_holder != previous:
+            yield i * buffer_duration, floor_holder, previous
+            previous = floor_holder
+
+
+def intervals_gen(blocks):
+    '''
+    Run-length encode consecutive blocks (arrays) of floor holders into
+    (start, end, floor_holder) intervals of buffer indices.
+
+    >>> list(intervals_gen([np.array([np.nan, 0, 0]), np.array([0, 1])]))
+    [(0, 1, nan), (1, 4, 0.0), (4, 5, 1.0)]
+    '''
+    offset = 0
+    start = current = None
+    for floor_holders in blocks:
+        if not len(floor_holders):
+            continue
+        # NaN never equals itself, compare with a sentinel instead
+        floor_holders = np.nan_to_num(floor_holders, nan=-1)
+        if current is None:
+            start, current = 0, floor_holders[0]
+        changes = np.flatnonzero(np.diff(floor_holders, prepend=current))
+        for change in changes.tolist():
+            yield start, offset + change, _from_sentinel(current)
+            start, current = offset + change, floor_holders[change]
+        offset += len(floor_holders)
+    if current is not None:
+        yield start, offset, _from_sentinel(current)
+
+
+def _from_sentinel(floor_holder):
+    return np.nan if floor_holder == -1 else float(floor_holder)
+
+
+def to_intervals(floor_holders, buffer_duration=1):
+    '''
+    Convert an array of floor holders to an (n, 3) array of start time,
+    end time, and floor holder.
+    '''
+    intervals = np.array(list(intervals_gen([floor_holders])), dtype=float)
+    return intervals.reshape(-1, 3) * [buffer_duration, buffer_duration, 1]
+
+
+def from_intervals(intervals, buffer_duration=1):
+    '''
+    Convert the output of `to_intervals` back to an array of floor holders.
+    '''
+    starts, ends, floor_holders = np.asarray(intervals, dtype=float).T
+    lengths = np.round((ends - starts) / buffer_duration).astype(int)
+    return np.repeat(floor_holders, lengths)
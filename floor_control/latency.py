@@ -0,0 +1,101 @@
+'''
+Decision latency of the detector: how long after a turn change the
+reported floor holder changes, and choosing the filter for a latency
+budget.
+'''
+import numpy as np
+import scipy.signal as ss
+
+from . import core
+
+# Loudness ratio (in RMS) between the speaking and the silent interactant
+# in the synthetic turn change, e.g. crosstalk 20dB below the speaker
+SWITCH_CONTRAST = 10
+# Give up measuring switches that take longer than that
+MAX_SWITCH_LAG = 60  # Seconds
+MIN_CUTOFF_FREQ = 0.01
+FILTER_ORDERS = (1, 2, 3, 4)
+
+
+def butter(cutoff_freq, sample_rate, order):
+    return ss.butter(N=order, Wn=cutoff_freq, fs=sample_rate)
+
+
+def dc_group_delay(b, a, sample_rate):
+    '''
+    Group delay of the filter at 0Hz, in seconds. That's how much the
+    filtered RMS lags a slowly changing input.
+
+    >>> b, a = butter(cutoff_freq=0.35, sample_rate=50, order=2)
+    >>> round(dc_group_delay(b, a, sample_rate=50), 2)
+    0.64
+    '''
+    _, delay = ss.group_delay((b, a), w=[0], fs=sample_rate)
+    return float(delay[0] / sample_rate)
+
+
+def switch_lag(b, a, hysteresis, sample_rate, contrast=SWITCH_CONTRAST):
+    '''
+    Seconds from a turn change until the detector reports the new floor
+    holder, at the end of a frame. Measured on a synthetic step: from a
+    steady state where interactant 0 is contrast times louder than
+    interactant 1, to the opposite. inf if it doesn't switch within
+    MAX_SWITCH_LAG.
+    '''
+    levels = np.array([contrast, 1.0])
+    # Start from the steady state of the first turn
+    zi = ss.lfilter_zi(b, a)[:, np.newaxis] * levels
+    after = np.tile(levels[::-1], (int(MAX_SWITCH_LAG * sample_rate), 1))
+    smooth, _ = ss.lfilter(b, a, after, axis=0, zi=zi)
+    argmax, decided = core.decide(smooth, hysteresis)
+    switched = np.flatnonzero(decided & (argmax == 1))
+    if not len(switched):
+        return np.inf
+    return float(switched[0] + 1) / sample_rate
+
+
+def noise_gain(b, a, sample_rate):
+    '''
+    Variance of the filter output for unit variance white noise input: the
+    lower, the smoother (and more stable) the filtered RMS.
+    '''
+    impulse = np.zeros(int(MAX_SWITCH_LAG * sample_rate))
+    impulse[0] = 1
+    return float(np.sum(ss.lfilter(b, a, impulse) ** 2))
+
+
+def choose_filter(latency_budget, hysteresis, sample_rate, orders=FILTER_ORDERS):
+    '''
+    Return the (order, cutoff_freq) of the smoothest Butterworth filter
+    that switches within latency_budget seconds. For every order, the
+    lowest cutoff frequency meeting the budget is found by bisection.
+    '''
+    max_cutoff_freq = 0.45 * sample_rate
+
+    def meets_budget(order, cutoff_freq):
+        b, a = butter(cutoff_freq, sample_rate, order)
+        return switch_lag(b, a, hysteresis, sample_rate) <= latency_budget
+
+    best = None
+    for order in orders:
+        if not meets_budget(order, max_cutoff_freq):
+            continue
+        low, high = MIN_CUTOFF_FREQ, max_cutoff_freq
+        if meets_budget(order, low):
+            high = low
+        # Bisect in log scale, high always meets the budget
+        for _ in range(30):
+            middle = np.sqrt(low * high)
+            if meets_budget(order, middle):
+                high = middle
+            else:
+                low = middle
+        gain = noise_gain(*butter(high, sample_rate, order), sample_rate)
+        if best is None or gain < best[0]:
+            best = (gain, order, high)
+    if best is None:
+        raise ValueError(
+            f'No filter switches within a latency budget of {latency_budget}s'
+        )
+    _, order, cutoff_freq = best
+    return order, float(cutoff_freq)
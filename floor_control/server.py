@@ -0,0 +1,213 @@
+'''
+An asyncio server for live floor control detection.
+
+Every connection is a session: the client streams buffers of interleaved
+PCM audio, one per interactant, and receives an event whenever the floor
+holder changes. All the sessions are processed together, in one
+vectorized step per buffer duration, by a `DetectorBank`.
+
+Client to server: each buffer is sent as a 4-byte big-endian length,
+followed by exactly buffer_size * num_of_interactants * sample_width
+bytes of interleaved samples.
+
+Server to client: one JSON object per line, with the index of the buffer
+that changed the floor, the new floor holder, and the previous one (null
+when undecided), e.g. {"buffer": 52, "floor_holder": 1, "previous": 0}.
+
+Every tick processes at most one pending buffer per session. A session
+stops being read when it has max_pending unprocessed buffers, so clients
+that send faster than real time are slowed down to it by TCP flow
+control. Clients that don't read their events are disconnected.
+
+    $ python -m floor_control.server --sample-rate 16000 --port 8765
+'''
+import argparse
+import asyncio
+import json
+import struct
+
+import numpy as np
+
+from . import core
+from .bank import DetectorBank
+
+_HEADER = struct.Struct('>I')
+MAX_PENDING = 5  # 100ms of 20ms buffers, to absorb network jitter
+MAX_WRITE_BUFFER = 64 * 1024
+
+
+class _Session:
+    def __init__(self, session_id, writer, max_pending):
+        self.id = session_id
+        self.writer = writer
+        self.pending = asyncio.Queue(maxsize=max_pending)
+        self.buffer_index = 0
+        self.floor_holder = None
+        self.closed = False
+        self.task = asyncio.current_task()
+
+
+class FloorControlServer:
+    def __init__(
+        self,
+        sample_rate,
+        sample_width,
+        buffer_duration=0.02,
+        cutoff_freq=0.35,
+        hysteresis=0.1,
+        num_of_interactants=2,
+        sample_format='int',
+        max_pending=MAX_PENDING,
+    ):
+        self._sample_width = sample_width
+        self._sample_format = sample_format
+        self._num_of_interactants = num_of_interactants
+        self._buffer_duration = buffer_duration
+        self._frame_size = (
+            int(sample_rate * buffer_duration) * num_of_interactants * sample_width
+        )
+        self._max_pending = max_pending
+        self._bank = DetectorBank(
+            sample_rate=sample_rate,
+            buffer_duration=buffer_duration,
+            cutoff_freq=cutoff_freq,
+            hysteresis=hysteresis,
+            num_of_interactants=num_of_interactants,
+        )
+        self._sessions = {}
+
+    async def handle_connection(self, reader, writer):
+        session = _Session(self._bank.add_session(), writer, self._max_pending)
+        self._sessions[session.id] = session
+        cancelled = False
+        try:
+            while True:
+                header = await reader.readexactly(_HEADER.size)
+                (size,) = _HEADER.unpack(header)
+                if size != self._frame_size:
+                    break
+                await session.pending.put(await reader.readexactly(size))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            session.closed = True
+            # Cancelled (e.g. on shutdown) the pending buffers won't be
+            # processed, otherwise the session is removed once they are
+            if cancelled and self._sessions.get(session.id) is session:
+                self._remove_session(session)
+
+    def process_pending(self):
+        '''
+        Process one pending buffer from every session that has one.
+        Sessions that are closing are removed without processing their
+        pending buffers, as their events can't be sent anymore.
+        '''
+        ready = [
+            s for s in self._sessions.values()
+            if not s.pending.empty() and not s.writer.is_closing()
+        ]
+        if ready:
+            samples = np.stack([
+                core.to_samples(
+                    s.pending.get_nowait(),
+                    self._sample_width,
+                    sample_format=self._sample_format,
+                    channels=self._num_of_interactants,
+                )
+                for s in ready
+            ])
+            floor_holders = self._bank.process([s.id for s in ready], samples)
+            for session, floor_holder in zip(ready, floor_holders.tolist()):
+                floor_holder = None if np.isnan(floor_holder) else int(floor_holder)
+                if floor_holder != session.floor_holder:
+                    self._send_event(session, floor_holder)
+                    session.floor_holder = floor_holder
+                session.buffer_index += 1
+
+        for session in list(self._sessions.values()):
+            if session.writer.is_closing() or (
+                session.closed and session.pending.empty()
+            ):
+                self._remove_session(session)
+                # Stop reading, if the connection handler is still running
+                session.task.cancel()
+
+    def _send_event(self, session, floor_holder):
+        event = {
+            'buffer': session.buffer_index,
+            'floor_holder': floor_holder,
+            'previous': session.floor_holder,
+        }
+        session.writer.write(json.dumps(event).encode() + b'\n')
+        if session.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            session.writer.close()
+            session.closed = True
+
+    def _remove_session(self, session):
+        del self._sessions[session.id]
+        self._bank.remove_session(session.id)
+        session.writer.close()
+
+    async def run_ticks(self):
+        '''
+        Process the pending buffers every buffer duration.
+        '''
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self._buffer_duration
+            await asyncio.sleep(max(0, next_tick - loop.time()))
+            self.process_pending()
+
+    async def serve(self, host=None, port=None, path=None):
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.run_ticks())
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m floor_control.server',
+        description='Serve live floor control detection over sockets.',
+    )
+    address = parser.add_mutually_exclusive_group(required=True)
+    address.add_argument('--port', type=int, help='TCP port')
+    address.add_argument('--unix', help='Unix socket path')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--sample-rate', type=int, required=True)
+    parser.add_argument('--sample-width', type=int, default=2, help='in bytes')
+    parser.add_argument('--sample-format', choices=['int', 'float'], default='int')
+    parser.add_argument('--channels', type=int, default=2)
+    parser.add_argument('--buffer-duration', type=float, default=0.02)
+    parser.add_argument('--cutoff-freq', type=float, default=0.35)
+    parser.add_argument('--hysteresis', type=float, default=0.1)
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING)
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    server = FloorControlServer(
+        sample_rate=args.sample_rate,
+        sample_width=args.sample_width,
+        buffer_duration=args.buffer_duration,
+        cutoff_freq=args.cutoff_freq,
+        hysteresis=args.hysteresis,
+        num_of_interactants=args.channels,
+        sample_format=args.sample_format,
+        max_pending=args.max_pending,
+    )
+    try:
+        asyncio.run(server.serve(host=args.host, port=args.port, path=args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
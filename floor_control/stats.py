@@ -0,0 +1,169 @@
+'''
+Opt-in instrumentation of `FloorControlDetector` and the `core` classes:
+per stage timing, and counters of the frames, the floor switches and the
+undecided frames.
+'''
+import functools
+import time
+
+import numpy as np
+
+STAGES = ('to_samples', 'rms', 'filter', 'argmax')
+
+
+class StageTimer:
+    '''
+    Cumulative nanoseconds and calls of a processing stage.
+    '''
+    def __init__(self):
+        self.ns = 0
+        self.calls = 0
+
+    def wrap(self, func):
+        '''
+        Return func, timed by this timer.
+        '''
+        @functools.wraps(func)
+        def timed(*args):
+            start_ns = time.perf_counter_ns()
+            result = func(*args)
+            self.ns += time.perf_counter_ns() - start_ns
+            self.calls += 1
+            return result
+        return timed
+
+    def snapshot(self):
+        return {'calls': self.calls, 'seconds': self.ns / 1e9}
+
+
+class Stats:
+    '''
+    Counters of an instrumented detector, updated after every frame (or
+    array of frames). timers maps every stage to its `StageTimer`.
+
+    Frames behind real time assumes frames are processed as they arrive:
+    it is the number of buffer durations elapsed since the first frame,
+    minus the frames processed so far.
+    '''
+    def __init__(self, buffer_duration, timers):
+        self._buffer_ns = buffer_duration * 1e9
+        self._buffer_duration = buffer_duration
+        self._timers = timers
+        self._start_ns = None
+        self._previous = None
+        self.frames = 0
+        self.frames_behind = 0
+        self.max_frames_behind = 0
+        self.floor_switches = 0
+        self.undecided_frames = 0
+
+    def _update(self, start_ns, end_ns, frames):
+        if self._start_ns is None:
+            self._start_ns = start_ns
+        self.frames += frames
+        expected = int((end_ns - self._start_ns) // self._buffer_ns) + 1
+        self.frames_behind = max(expected - self.frames, 0)
+        self.max_frames_behind = max(self.max_frames_behind, self.frames_behind)
+
+    def record(self, floor_holder, start_ns, end_ns):
+        '''
+        Record a frame processed from start_ns to end_ns (perf_counter_ns).
+        '''
+        self._update(start_ns, end_ns, 1)
+        if floor_holder is None:
+            self.undecided_frames += 1
+        else:
+            if self._previous is not None and floor_holder != self._previous:
+                self.floor_switches += 1
+            self._previous = floor_holder
+
+    def record_array(self, floor_holders, start_ns, end_ns):
+        '''
+        Same as `record` for an array of floor holders, with NaN for
+        undecided.
+        '''
+        if not len(floor_holders):
+            return
+        self._update(start_ns, end_ns, len(floor_holders))
+        decided = floor_holders[~np.isnan(floor_holders)]
+        self.undecided_frames += len(floor_holders) - len(decided)
+        if self._previous is not None:
+            decided = np.concatenate([[self._previous], decided])
+        self.floor_switches += int(np.count_nonzero(np.diff(decided)))
+        if len(decided):
+            self._previous = int(decided[-1])
+
+    def snapshot(self):
+        return {
+            'frames': self.frames,
+            'stage_seconds': {
+                stage: self._timers[stage].ns / 1e9 for stage in STAGES
+            },
+            'frames_behind': self.frames_behind,
+            'max_frames_behind': self.max_frames_behind,
+            'floor_switches': self.floor_switches,
+            'undecided_frames': self.undecided_frames,
+            'undecided_seconds': self.undecided_frames * self._buffer_duration,
+        }
+
+
+_METRICS = [
+    # name, type, help, snapshot key
+    ('frames', 'counter', 'Frames processed.', 'frames'),
+    ('frames_behind', 'gauge', 'Frames behind real time.', 'frames_behind'),
+    (
+        'max_frames_behind',
+        'gauge',
+        'Maximum frames behind real time.',
+        'max_frames_behind',
+    ),
+    ('floor_switches', 'counter', 'Floor holder changes.', 'floor_switches'),
+    (
+        'undecided_seconds',
+        'counter',
+        'Time the floor was undecided.',
+        'undecided_seconds',
+    ),
+]
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (k, str(v).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for k, v in labels.items()
+    )
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+def to_prometheus(snapshots, prefix='floor_control', openmetrics=False):
+    '''
+    Format stats snapshots in the Prometheus text exposition format, or
+    in the OpenMetrics one. snapshots is a list of (labels dict, snapshot)
+    pairs, e.g. one per session.
+
+    Counter samples are exposed with a _total suffix. OpenMetrics names the
+    counter family without it, while the Prometheus text format names the
+    metric as exposed.
+    '''
+    def header(name, type_, help_):
+        family = name if openmetrics or type_ != 'counter' else f'{name}_total'
+        return [f'# HELP {family} {help_}', f'# TYPE {family} {type_}']
+
+    lines = []
+    for name, type_, help_, key in _METRICS:
+        suffix = '_total' if type_ == 'counter' else ''
+        lines += header(f'{prefix}_{name}', type_, help_)
+        for labels, snapshot in snapshots:
+            value = snapshot[key]
+            lines.append(f'{prefix}_{name}{suffix}{_format_labels(labels)} {value!r}')
+    name = f'{prefix}_stage_seconds'
+    lines += header(name, 'counter', 'Time spent in every processing stage.')
+    for labels, snapshot in snapshots:
+        for stage, seconds in snapshot['stage_seconds'].items():
+            stage_labels = {**labels, 'stage': stage}
+            lines.append(f'{name}_total{_format_labels(stage_labels)} {seconds!r}')
+    if openmetrics:
+        lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
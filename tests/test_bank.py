@@ -0,0 +1,45 @@
+from hypothesis import given
+import hypothesis.strategies as st
+import numpy as np
+
+from conftest import square_wave
+from floor_control import DetectorBank, FloorControlDetector
+
+SAMPLE_RATE = 8000
+BUFFER_SIZE = int(0.02 * SAMPLE_RATE)
+
+amplitudes = st.lists(
+    st.tuples(st.integers(0, 2 ** 15 - 1), st.integers(0, 2 ** 15 - 1)),
+    min_size=5,
+    max_size=5,
+)
+
+
+@given(ticks=st.lists(amplitudes, min_size=1, max_size=50))
+def test_bank_matches_detectors(ticks):
+    bank = DetectorBank(sample_rate=SAMPLE_RATE, capacity=2)
+    session_ids = [bank.add_session() for _ in range(5)]
+    detectors = [
+        FloorControlDetector(sample_rate=SAMPLE_RATE, sample_width=2)
+        for _ in session_ids
+    ]
+    for tick in ticks:
+        buffers = [square_wave(a, BUFFER_SIZE) for a in tick]
+        result = bank.process(session_ids, np.stack(buffers))
+        expected = [
+            d.process([b[:, 0].tobytes(), b[:, 1].tobytes()])
+            for d, b in zip(detectors, buffers)
+        ]
+        assert [None if np.isnan(x) else x for x in result] == expected
+
+
+def test_bank_reuses_removed_sessions():
+    bank = DetectorBank(sample_rate=SAMPLE_RATE, capacity=2)
+    a = bank.add_session()
+    b = bank.add_session()
+    bank.process([a, b], np.stack([square_wave((1000, 10), BUFFER_SIZE)] * 2))
+    bank.remove_session(a)
+    assert bank.add_session() == a
+    silence = np.stack([square_wave((0, 0), BUFFER_SIZE)])
+    assert np.isnan(bank.process([a], silence)).all()
+    assert list(bank.sessions) == [a, b]
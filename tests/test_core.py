@@ -0,0 +1,112 @@
+import warnings
+
+from hypothesis import given
+import hypothesis.strategies as st
+import numpy as np
+import pytest
+import scipy.signal as ss
+
+from floor_control import core
+
+@given(
+    data=st.data(),
+    sample_width=st.integers(min_value=1, max_value=4),
+)
+def test_frame_rms_matches_audioop(data, sample_width):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        audioop = pytest.importorskip('audioop')
+    fragment = data.draw(st.binary(min_size=sample_width, max_size=100 * sample_width))
+    fragment = fragment[:len(fragment) - len(fragment) % sample_width]
+    result = core.frame_rms(core.to_samples(fragment, sample_width))
+    # 32-bit squares can't be summed exactly
+    assert abs(result[0] - audioop.rms(fragment, sample_width)) <= (sample_width == 4)
+
+
+rms_values = st.floats(min_value=0, max_value=2 ** 15)
+
+
+@given(
+    samples=st.lists(rms_values, min_size=1, max_size=100),
+    order=st.integers(min_value=1, max_value=4),
+)
+def test_filter_matches_lfilter(samples, order):
+    filter_ = core.Filter(cutoff_freq=0.35, sample_rate=50, order=order)
+    expected = ss.lfilter(filter_._b, filter_._a, samples)
+    result = [filter_.process(s) for s in samples]
+    assert result == expected.tolist()
+
+
+@given(
+    samples=st.lists(st.tuples(rms_values, rms_values, rms_values), min_size=1, max_size=100),
+    order=st.integers(min_value=1, max_value=4),
+)
+def test_multi_channel_filter_matches_lfilter(samples, order):
+    filter_ = core.MultiChannelFilter(
+        cutoff_freq=0.35, sample_rate=50, channels=3, order=order
+    )
+    expected = ss.lfilter(filter_._b, filter_._a, samples, axis=0)
+    result = [filter_.process(s).tolist() for s in samples]
+    assert result == expected.tolist()
+
+
+@given(
+    samples=st.lists(st.tuples(rms_values, rms_values, rms_values), min_size=1, max_size=100),
+    order=st.integers(min_value=1, max_value=4),
+)
+def test_multi_channel_filter_warm_start(samples, order):
+    samples = np.array(samples)
+    filter_ = core.MultiChannelFilter(
+        cutoff_freq=0.35, sample_rate=50, channels=3, order=order, warm_start=True
+    )
+    zi = ss.lfilter_zi(filter_._b, filter_._a)[:, np.newaxis] * samples[0]
+    expected = ss.lfilter(filter_._b, filter_._a, samples, axis=0, zi=zi)[0]
+    assert filter_.warm_start_pending
+    result = [filter_.process(s).tolist() for s in samples]
+    assert not filter_.warm_start_pending
+    np.testing.assert_allclose(result, expected)
+
+    filter_ = core.MultiChannelFilter(
+        cutoff_freq=0.35, sample_rate=50, channels=3, order=order, warm_start=True
+    )
+    filter_.process_array(samples[:0])
+    assert filter_.warm_start_pending
+    np.testing.assert_allclose(filter_.process_array(samples), expected)
+
+
+def argsort_argmax_gen(samples, hysteresis):
+    '''
+    The original StableArgmax implementation, as a reference.
+    '''
+    previous = None
+    for row in samples:
+        argsort = np.argsort(row)
+        max_ = row[argsort[-1]]
+        next_ = row[argsort[-2]]
+        if next_ and max_ / next_ > (1 + hysteresis):
+            previous = argsort[-1]
+        yield previous
+
+
+interactants_samples = st.integers(min_value=2, max_value=100).flatmap(
+    lambda n: st.lists(
+        st.lists(st.sampled_from([0, 1, 1.05, 2, 10]), min_size=n, max_size=n),
+        min_size=1,
+        max_size=50,
+    )
+)
+
+
+@given(samples=interactants_samples)
+def test_stable_argmax_matches_argsort(samples):
+    argmax = core.StableArgmax(hysteresis=0.1)
+    result = [argmax.process(np.array(row)) for row in samples]
+    assert result == list(argsort_argmax_gen(np.array(samples), hysteresis=0.1))
+
+
+@given(samples=interactants_samples)
+def test_stable_argmax_process_array(samples):
+    argmax = core.StableArgmax(hysteresis=0.1)
+    result = argmax.process_array(samples)
+    expected = argsort_argmax_gen(np.array(samples), hysteresis=0.1)
+    assert [None if np.isnan(x) else x for x in result] == list(expected)
@@ -0,0 +1,33 @@
+from hypothesis import given
+import hypothesis.strategies as st
+import numpy as np
+
+from floor_control import events
+
+floor_holders = st.lists(st.sampled_from([np.nan, 0, 1, 2]), max_size=100)
+
+
+@given(floor_holders=floor_holders)
+def test_intervals_round_trip(floor_holders):
+    floor_holders = np.array(floor_holders, dtype=float)
+    intervals = events.to_intervals(floor_holders, buffer_duration=0.02)
+    result = events.from_intervals(intervals, buffer_duration=0.02)
+    np.testing.assert_array_equal(result, floor_holders)
+
+
+@given(floor_holders=floor_holders, split=st.integers(0, 100))
+def test_intervals_gen_across_blocks(floor_holders, split):
+    floor_holders = np.array(floor_holders, dtype=float)
+    blocks = [floor_holders[:split], floor_holders[split:]]
+    np.testing.assert_array_equal(
+        list(events.intervals_gen(blocks)),
+        list(events.intervals_gen([floor_holders])),
+    )
+
+
+@given(floor_holders=floor_holders)
+def test_changes_match_intervals(floor_holders):
+    changes = list(events.changes_gen(floor_holders))
+    intervals = events.to_intervals(np.array(floor_holders, dtype=float))
+    decided = [(s, h) for s, _, h in intervals.tolist() if not np.isnan(h)]
+    assert [(t, h) for t, h, _ in changes if h is not None] == decided
@@ -1,6 +1,9 @@
 from hypothesis import given, settings, HealthCheck
 import hypothesis.strategies as st
+import numpy as np
+import pytest
 
+from conftest import square_waves
 from floor_control import FloorControlDetector
 
 
@@ -29,3 +32,98 @@ def test_process_1_sec(a_frame, b_frame):
             floor_detected = True
         if floor_detected:
             assert floor_holder in [0, 1]
+
+
+@given(
+    # Per buffer amplitudes, for 1 second of 2 interactants
+    amplitudes=st.lists(
+        st.tuples(st.integers(0, 2 ** 15 - 1), st.integers(0, 2 ** 15 - 1)),
+        min_size=50,
+        max_size=50,
+    ),
+)
+def test_process_array_matches_process(amplitudes):
+    buffers = square_waves(amplitudes, int(0.02 * 16000))
+
+    floor_detector = FloorControlDetector(sample_rate=16000, sample_width=2)
+    expected = [
+        floor_detector.process([b[:, 0].tobytes(), b[:, 1].tobytes()])
+        for b in buffers
+    ]
+
+    floor_detector = FloorControlDetector(sample_rate=16000, sample_width=2)
+    result = floor_detector.process_array(np.vstack(buffers))
+    assert [None if np.isnan(x) else x for x in result] == expected
+
+
+@given(
+    # 20ms of interleaved 16bit stereo audio in 48Khz sample rate
+    frame=st.binary(min_size=int(0.02 * 48000 * 4), max_size=int(0.02 * 48000 * 4)),
+)
+def test_process_interleaved(frame):
+    samples = np.frombuffer(frame, dtype=np.int16).reshape(-1, 2)
+    floor_detector = FloorControlDetector(sample_rate=48000, sample_width=2)
+    expected = floor_detector.process([samples[:, 0].tobytes(), samples[:, 1].tobytes()])
+    for fragment in [frame, memoryview(frame), samples]:
+        floor_detector = FloorControlDetector(sample_rate=48000, sample_width=2)
+        assert floor_detector.process(fragment) == expected
+
+
+@given(
+    # Per buffer amplitudes, for 1 second of 2 interactants
+    amplitudes=st.lists(
+        st.tuples(st.integers(0, 2 ** 15 - 1), st.integers(0, 2 ** 15 - 1)),
+        min_size=50,
+        max_size=50,
+    ),
+    splits=st.lists(st.integers(0, 50 * int(0.02 * 16000)), max_size=20),
+    hop_duration=st.sampled_from([0.005, 0.01, 0.02]),
+)
+def test_feed_matches_process_array(amplitudes, splits, hop_duration):
+    samples = np.vstack(square_waves(amplitudes, int(0.02 * 16000)))
+
+    floor_detector = FloorControlDetector(
+        sample_rate=16000, sample_width=2, hop_duration=hop_duration
+    )
+    expected = [
+        None if np.isnan(x) else x
+        for x in floor_detector.process_array(samples)
+    ]
+
+    floor_detector = FloorControlDetector(
+        sample_rate=16000, sample_width=2, hop_duration=hop_duration
+    )
+    result = []
+    for fragment in np.split(samples, sorted(splits)):
+        # Per channel bytes, as delivered by a media stack
+        result += floor_detector.feed(
+            [fragment[:, 0].tobytes(), fragment[:, 1].tobytes()]
+        )
+    assert result == expected
+
+
+def test_hop_duration():
+    samples = np.random.default_rng(0).integers(
+        -2 ** 15, 2 ** 15, (16000, 2), dtype=np.int16
+    )
+    floor_detector = FloorControlDetector(
+        sample_rate=16000, sample_width=2, hop_duration=0.01
+    )
+    result = floor_detector.process_array(samples)
+    # Overlapping 20ms buffers every 10ms
+    assert len(result) == 99
+
+    floor_detector = FloorControlDetector(
+        sample_rate=16000, sample_width=2, hop_duration=0.01
+    )
+    expected = [
+        floor_detector.process(samples[start:start + 320])
+        for start in range(0, 16000 - 320 + 1, 160)
+    ]
+    assert [None if np.isnan(x) else x for x in result] == expected
+
+    for hop_duration in [0, 0.04]:
+        with pytest.raises(ValueError):
+            FloorControlDetector(
+                sample_rate=16000, sample_width=2, hop_duration=hop_duration
+            )
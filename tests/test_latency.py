@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from conftest import square_wave
+from floor_control import FloorControlDetector, latency
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'latency_budget': 0.3}, {'hysteresis': 1}])
+def test_switch_lag_matches_detector(kwargs):
+    buffer_size = int(0.02 * 16000)
+    detector = FloorControlDetector(sample_rate=16000, sample_width=2, **kwargs)
+    # Interactant 0 speaking for a minute and then interactant 1
+    amplitudes = np.array([latency.SWITCH_CONTRAST, 1]) * 1000
+    turns = [
+        np.tile(square_wave(amplitudes, buffer_size), (3000, 1)),
+        np.tile(square_wave(amplitudes[::-1], buffer_size), (100, 1)),
+    ]
+    floor_holders = detector.process_array(np.vstack(turns))
+    assert floor_holders[2999] == 0
+    switch_frames = np.flatnonzero(floor_holders[3000:] == 1)[0] + 1
+    assert switch_frames * 0.02 == pytest.approx(detector.latency()['switch_lag'])
+
+
+def test_latency_budget():
+    for budget in [0.1, 0.5, 2]:
+        order, cutoff_freq = latency.choose_filter(budget, hysteresis=0.1, sample_rate=50)
+        b, a = latency.butter(cutoff_freq, 50, order)
+        assert latency.switch_lag(b, a, hysteresis=0.1, sample_rate=50) <= budget
+    with pytest.raises(ValueError):
+        latency.choose_filter(0.01, hysteresis=0.1, sample_rate=50)
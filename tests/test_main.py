@@ -0,0 +1,127 @@
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from conftest import dialogue
+from floor_control import FloorControlDetector
+from floor_control.__main__ import main
+
+SAMPLE_RATE = 8000
+# The sub format GUID after the format tag
+KSDATAFORMAT_SUBTYPE_TAIL = bytes.fromhex('000000001000800000aa00389b71')
+
+
+def test_main_writes_floor_holder_intervals(tmp_path):
+    # 2 seconds turns
+    samples = dialogue(10, 2 * SAMPLE_RATE)
+    with wave.open(str(tmp_path / 'dialogue.wav'), 'wb') as wf:
+        wf.setnchannels(2)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(samples.tobytes())
+
+    main([
+        str(tmp_path / 'dialogue.wav'),
+        '--output', str(tmp_path / 'floor.npy'),
+        '--block-duration', '0.3',
+    ])
+
+    detector = FloorControlDetector(sample_rate=SAMPLE_RATE, sample_width=2)
+    expected = detector.process_array(samples)
+    intervals = np.load(tmp_path / 'floor.npy')
+    result = np.concatenate([
+        np.full(int(round((end - start) / 0.02)), holder)
+        for start, end, holder in intervals
+    ])
+    np.testing.assert_array_equal(result, expected)
+    assert (intervals[1:, 2] != intervals[:-1, 2]).all()
+
+
+def write_wav(filepath, samples, format_tag, extensible=False):
+    '''
+    Write a WAV file by hand, for formats the wave module doesn't write.
+    '''
+    sample_width = samples.dtype.itemsize
+    channels = samples.shape[1]
+    fmt = struct.pack(
+        '<HHIIHH',
+        0xFFFE if extensible else format_tag,
+        channels,
+        SAMPLE_RATE,
+        SAMPLE_RATE * channels * sample_width,
+        channels * sample_width,
+        8 * sample_width,
+    )
+    if extensible:
+        # cbSize, valid bits, channel mask, and the sub format GUID
+        fmt += struct.pack('<HHI', 22, 8 * sample_width, 0b11)
+        fmt += struct.pack('<H', format_tag) + KSDATAFORMAT_SUBTYPE_TAIL
+    data = samples.tobytes()
+    chunks = b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+    chunks += b'LIST' + struct.pack('<I', 3) + b'abc\x00'  # Padded to even
+    chunks += b'data' + struct.pack('<I', len(data)) + data
+    filepath.write_bytes(b'RIFF' + struct.pack('<I', len(chunks)) + chunks)
+
+
+def test_main_reads_float_and_extensible_wav(tmp_path):
+    samples = dialogue(
+        5, SAMPLE_RATE, interactants=3, loud=0.3, quiet=0.01, dtype=np.float32
+    )
+    detector = FloorControlDetector(
+        sample_rate=SAMPLE_RATE, sample_width=4, sample_format='float',
+        num_of_interactants=3,
+    )
+    expected = detector.process_array(samples)
+
+    for extensible in [False, True]:
+        write_wav(tmp_path / 'dialogue.wav', samples, 0x0003, extensible)
+        main([str(tmp_path / 'dialogue.wav'), '--output', str(tmp_path / 'floor.npy')])
+        intervals = np.load(tmp_path / 'floor.npy')
+        result = np.concatenate([
+            np.full(int(round((end - start) / 0.02)), holder)
+            for start, end, holder in intervals
+        ])
+        np.testing.assert_array_equal(result, expected)
+
+
+def test_main_rejects_unsupported_wav(tmp_path):
+    samples = np.zeros((SAMPLE_RATE, 2), dtype=np.float64)
+    write_wav(tmp_path / 'dialogue.wav', samples, 0x0003, extensible=True)
+    with pytest.raises(SystemExit, match='Unsupported WAV format'):
+        main([str(tmp_path / 'dialogue.wav')])
+
+
+def test_main_ignores_trailing_partial_frame(tmp_path, capsys):
+    samples = np.zeros((SAMPLE_RATE, 2), dtype=np.int16)
+    (tmp_path / 'dialogue.pcm').write_bytes(samples.tobytes() + b'\x00')
+    main([
+        str(tmp_path / 'dialogue.pcm'),
+        '--raw', '--sample-rate', str(SAMPLE_RATE), '--sample-width', '2',
+        '--channels', '2',
+        '--output', str(tmp_path / 'floor.npy'),
+    ])
+    intervals = np.load(tmp_path / 'floor.npy')
+    assert intervals[-1, 1] == 1
+    assert 'partial frame of 1 bytes' in capsys.readouterr().err
+
+
+def test_main_rejects_single_channel(tmp_path):
+    samples = np.zeros((SAMPLE_RATE, 1), dtype=np.int16)
+    with wave.open(str(tmp_path / 'mono.wav'), 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(samples.tobytes())
+    (tmp_path / 'mono.pcm').write_bytes(samples.tobytes())
+    for args in [
+        [str(tmp_path / 'mono.wav')],
+        [
+            str(tmp_path / 'mono.pcm'),
+            '--raw', '--sample-rate', str(SAMPLE_RATE), '--sample-width', '2',
+            '--channels', '1',
+        ],
+    ]:
+        with pytest.raises(SystemExit, match='at least 2'):
+            main(args)
@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from conftest import dialogue, square_wave
+from floor_control import FloorControlDetector
+from floor_control import server as server_module
+from floor_control.server import FloorControlServer
+
+SAMPLE_RATE = 8000
+BUFFER_SIZE = int(0.02 * SAMPLE_RATE)
+
+
+async def stream(path, buffers):
+    reader, writer = await asyncio.open_unix_connection(path)
+    for buffer in buffers:
+        data = buffer.tobytes()
+        writer.write(len(data).to_bytes(4, 'big') + data)
+        await writer.drain()
+    writer.write_eof()
+    events = [json.loads(line) async for line in reader]
+    writer.close()
+    return events
+
+
+def test_server_sends_floor_changes(tmp_path):
+    # Turns of 10 buffers
+    buffers = np.split(dialogue(20, 10 * BUFFER_SIZE), 200)
+    detector = FloorControlDetector(sample_rate=SAMPLE_RATE, sample_width=2)
+    floor_holders = [detector.process(b) for b in buffers]
+    expected = [
+        {'buffer': i, 'floor_holder': h, 'previous': p}
+        for i, (p, h) in enumerate(zip([None] + floor_holders, floor_holders))
+        if h != p
+    ]
+
+    async def run():
+        server = FloorControlServer(sample_rate=SAMPLE_RATE, sample_width=2)
+        path = str(tmp_path / 'floor_control.sock')
+        serving = asyncio.ensure_future(server.serve(path=path))
+        while not (tmp_path / 'floor_control.sock').exists():
+            await asyncio.sleep(0.01)
+        results = await asyncio.gather(*[stream(path, buffers) for _ in range(3)])
+        serving.cancel()
+        return results
+
+    for events in asyncio.run(run()):
+        assert events == expected
+
+
+def test_server_paces_sessions(tmp_path):
+    # Sent as fast as possible, processed one buffer per tick
+    buffers = [np.zeros((BUFFER_SIZE, 2), dtype=np.int16)] * 30
+
+    async def run():
+        server = FloorControlServer(sample_rate=SAMPLE_RATE, sample_width=2)
+        path = str(tmp_path / 'floor_control.sock')
+        serving = asyncio.ensure_future(server.serve(path=path))
+        while not (tmp_path / 'floor_control.sock').exists():
+            await asyncio.sleep(0.01)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await stream(path, buffers)
+        elapsed = loop.time() - start
+        serving.cancel()
+        return elapsed
+
+    assert asyncio.run(run()) >= (len(buffers) - 1) * 0.02
+
+
+def test_server_cancelled_connection(tmp_path):
+    async def run():
+        server = FloorControlServer(sample_rate=SAMPLE_RATE, sample_width=2)
+        path = str(tmp_path / 'floor_control.sock')
+        serving = asyncio.ensure_future(server.serve(path=path))
+        while not (tmp_path / 'floor_control.sock').exists():
+            await asyncio.sleep(0.01)
+        _, writer = await asyncio.open_unix_connection(path)
+        while not server._sessions:
+            await asyncio.sleep(0.01)
+        (session,) = server._sessions.values()
+        session.task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await session.task
+        serving.cancel()
+        writer.close()
+        return server
+
+    server = asyncio.run(run())
+    assert not server._sessions
+    assert not len(server._bank.sessions)
+
+
+def test_server_drops_clients_that_dont_read(tmp_path, monkeypatch):
+    # Disconnect on the first event
+    monkeypatch.setattr(server_module, 'MAX_WRITE_BUFFER', -1)
+    buffers = [square_wave((8000, 100), BUFFER_SIZE)] * 5
+
+    async def run():
+        server = FloorControlServer(sample_rate=SAMPLE_RATE, sample_width=2)
+        path = str(tmp_path / 'floor_control.sock')
+        serving = asyncio.ensure_future(server.serve(path=path))
+        while not (tmp_path / 'floor_control.sock').exists():
+            await asyncio.sleep(0.01)
+        reader, writer = await asyncio.open_unix_connection(path)
+        for buffer in buffers:
+            data = buffer.tobytes()
+            writer.write(len(data).to_bytes(4, 'big') + data)
+        await writer.drain()
+        events = [json.loads(line) async for line in reader]
+        # Removed with its pending buffers, once the writer is closed
+        sessions = dict(server._sessions)
+        serving.cancel()
+        writer.close()
+        return events, sessions
+
+    events, sessions = asyncio.run(run())
+    assert events == [{'buffer': 0, 'floor_holder': 0, 'previous': None}]
+    assert not sessions
@@ -0,0 +1,70 @@
+from hypothesis import given, settings
+import hypothesis.strategies as st
+import numpy as np
+import pytest
+
+from conftest import dialogue
+from floor_control import FloorControlDetector
+
+# 4 seconds, with turns of 0.5 seconds
+SAMPLES = dialogue(8, 8000, loud=3000)
+
+
+@settings(deadline=None)
+@given(
+    split=st.integers(0, len(SAMPLES)),
+    kwargs=st.sampled_from([
+        {},
+        {'hop_duration': 0.01},
+        {'warm_start': True},
+        {'latency_budget': 0.3},
+    ]),
+)
+def test_restore_continues_exactly(split, kwargs):
+    detector = FloorControlDetector(sample_rate=16000, sample_width=2, **kwargs)
+    before = detector.feed(SAMPLES[:split])
+    restored = FloorControlDetector.restore(detector.snapshot())
+    assert restored.snapshot() == detector.snapshot()
+    assert restored.latency() == detector.latency()
+
+    expected = detector.feed(SAMPLES[split:])
+    assert restored.feed(SAMPLES[split:]) == expected
+
+    uninterrupted = FloorControlDetector(sample_rate=16000, sample_width=2, **kwargs)
+    assert uninterrupted.feed(SAMPLES) == before + expected
+
+
+def test_restore_float_samples():
+    samples = (SAMPLES / 2 ** 15).astype(np.float32)
+    detector = FloorControlDetector(
+        sample_rate=16000, sample_width=4, sample_format='float'
+    )
+    detector.feed(samples[:1000].tobytes())
+    restored = FloorControlDetector.restore(detector.snapshot(), instrument=True)
+    assert restored.feed(samples[1000:]) == detector.feed(samples[1000:])
+    assert restored.stats()['frames'] > 0
+
+
+def test_snapshot_size():
+    detector = FloorControlDetector(sample_rate=16000, sample_width=2)
+    detector.process_array(SAMPLES)
+    assert len(detector.snapshot()) < 100
+
+
+def test_restore_unsupported():
+    snapshot = bytearray(FloorControlDetector(sample_rate=16000, sample_width=2).snapshot())
+    snapshot[4] += 1  # Version
+    with pytest.raises(ValueError):
+        FloorControlDetector.restore(snapshot)
+
+
+def test_snapshot_many_interactants():
+    interactants = 40000
+    detector = FloorControlDetector(
+        sample_rate=100, sample_width=2, num_of_interactants=interactants
+    )
+    samples = np.ones((2, interactants), dtype=np.int16)
+    samples[:, -1] = 1000
+    assert detector.process(samples) == interactants - 1
+    restored = FloorControlDetector.restore(detector.snapshot())
+    assert restored.process(samples) == interactants - 1
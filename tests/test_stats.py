@@ -0,0 +1,93 @@
+from hypothesis import given
+import hypothesis.strategies as st
+import numpy as np
+import pytest
+
+from conftest import square_waves
+from floor_control import FloorControlDetector, core, stats
+
+
+@given(
+    amplitudes=st.lists(
+        st.tuples(st.integers(0, 2 ** 15 - 1), st.integers(0, 2 ** 15 - 1)),
+        min_size=1,
+        max_size=50,
+    ),
+    split=st.integers(0, 50),
+)
+def test_stats_counters(amplitudes, split):
+    buffers = square_waves(amplitudes, int(0.02 * 16000))
+    detector = FloorControlDetector(sample_rate=16000, sample_width=2, instrument=True)
+    results = [detector.process(b.tobytes()) for b in buffers]
+    snapshot = detector.stats()
+
+    decided = [x for x in results if x is not None]
+    assert snapshot['frames'] == len(buffers)
+    assert snapshot['undecided_frames'] == results.count(None)
+    assert snapshot['floor_switches'] == sum(
+        a != b for a, b in zip(decided, decided[1:])
+    )
+    assert all(s >= 0 for s in snapshot['stage_seconds'].values())
+
+    # Same counters when processing arrays, in two calls
+    detector = FloorControlDetector(sample_rate=16000, sample_width=2, instrument=True)
+    empty = np.empty((0, 2), dtype=np.int16)
+    detector.process_array(np.vstack([empty] + buffers[:split]))
+    detector.process_array(np.vstack([empty] + buffers[split:]))
+    array_snapshot = detector.stats()
+    for key in ['frames', 'undecided_frames', 'floor_switches']:
+        assert array_snapshot[key] == snapshot[key]
+
+
+def test_not_instrumented():
+    detector = FloorControlDetector(sample_rate=16000, sample_width=2)
+    # The plain method, no instrumentation in the way
+    assert detector.process.__func__ is FloorControlDetector.process
+    with pytest.raises(ValueError):
+        detector.stats()
+
+
+@pytest.mark.parametrize('make', [
+    lambda **kwargs: core.Filter(cutoff_freq=0.35, sample_rate=50, **kwargs),
+    lambda **kwargs: core.MultiChannelFilter(
+        cutoff_freq=0.35, sample_rate=50, channels=2, **kwargs
+    ),
+    lambda **kwargs: core.MultiChannelFilter(
+        cutoff_freq=0.35, sample_rate=50, channels=2, warm_start=True, **kwargs
+    ),
+    lambda **kwargs: core.StableArgmax(hysteresis=0.1, **kwargs),
+])
+def test_core_instrumentation(make):
+    samples = np.random.default_rng(0).random((20, 2)) * 1000
+    if isinstance(make(), core.Filter):
+        samples = samples[:, 0]
+    plain, instrumented = make(), make(instrument=True)
+    for sample in samples[:10]:
+        assert np.array_equal(instrumented.process(sample), plain.process(sample))
+    np.testing.assert_array_equal(
+        instrumented.process_array(samples[10:]), plain.process_array(samples[10:])
+    )
+    snapshot = instrumented.stats()
+    assert snapshot['calls'] == 11
+    assert snapshot['seconds'] > 0
+    with pytest.raises(ValueError):
+        plain.stats()
+
+
+def test_to_prometheus():
+    detector = FloorControlDetector(sample_rate=16000, sample_width=2, instrument=True)
+    for buffer in square_waves([(1000, 10)] * 5, int(0.02 * 16000)):
+        detector.process(buffer.tobytes())
+    text = stats.to_prometheus([({'session': 'a'}, detector.stats())])
+    lines = text.splitlines()
+    assert 'floor_control_frames_total{session="a"} 5' in lines
+    assert '# TYPE floor_control_frames_behind gauge' in lines
+    assert '# TYPE floor_control_frames_total counter' in lines
+    assert '# HELP floor_control_stage_seconds_total Time spent in every processing stage.' in lines
+    assert any(
+        line.startswith('floor_control_stage_seconds_total{session="a",stage="rms"} ')
+        for line in lines
+    )
+    text = stats.to_prometheus([], openmetrics=True)
+    assert '# TYPE floor_control_frames counter' in text.splitlines()
+    assert text.endswith('# EOF\n')